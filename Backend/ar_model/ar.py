@@ -1,23 +1,32 @@
 from flask import Flask, request, jsonify
 import pandas as pd
 import joblib
-import traceback
+import logging
+import os
+import sys
 import firebase_admin
 from firebase_admin import credentials, firestore
 from flask_cors import CORS
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from instrumentation import configure_logging, stage_timer, register_metrics_endpoint, mark_ready
+
+# Set up logging (level from LOG_LEVEL, switchable at runtime via /log_level)
+logger = configure_logging(__name__)
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend communication
+register_metrics_endpoint(app, service='ar')
 
 # Load Firebase credentials and initialize Firestore
 try:
     cred = credentials.Certificate("./../firebaseConfig.js")
     firebase_admin.initialize_app(cred)
     db = firestore.client()
-    print("[DEBUG] Firebase initialized successfully.")
+    logger.debug("[DEBUG] Firebase initialized successfully.")
 except Exception as e:
-    print(f"[ERROR] Firebase initialization failed: {e}")
+    logger.error("[ERROR] Firebase initialization failed: %s", e)
 
 # Load ML models
 try:
@@ -26,19 +35,20 @@ try:
         "Therapy2": joblib.load("best_model_Decision Tree_Therapy2.joblib"),
         "Therapy3": joblib.load("best_model_Decision Tree_Therapy3.joblib"),
     }
-    print("[DEBUG] ML models loaded successfully.")
+    logger.debug("[DEBUG] ML models loaded successfully.")
 except FileNotFoundError as e:
-    print(f"[ERROR] Model file not found: {e}")
+    logger.error("[ERROR] Model file not found: %s", e)
 except Exception as e:
-    print(f"[ERROR] Error loading models: {e}")
+    logger.error("[ERROR] Error loading models: %s", e)
 
 # Load dataset for additional recommendations
 try:
     dataset = pd.read_csv("cleaned_AR_dataset.csv")
-    print("[DEBUG] Dataset loaded successfully. Shape:", dataset.shape)
-    print("[DEBUG] Dataset Preview:\n", dataset.head())  # Display first rows
+    logger.debug("[DEBUG] Dataset loaded successfully. Shape: %s", dataset.shape)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[DEBUG] Dataset Preview:\n%s", dataset.head())  # Display first rows
 except FileNotFoundError:
-    print("[ERROR] cleaned_AR_dataset.csv file not found.")
+    logger.error("[ERROR] cleaned_AR_dataset.csv file not found.")
     dataset = pd.DataFrame()  # Fallback to empty dataset
 
 # Define mappings for categorical features
@@ -53,7 +63,7 @@ def predict():
     """
     try:
         data = request.json
-        print("[DEBUG] Received request data:", data)
+        logger.debug("[DEBUG] Received request data: %s", data)
 
         # Extract user data from request
         age = int(data.get("age", 0))
@@ -65,7 +75,7 @@ def predict():
 
         # Calculate BMI
         bmi = weight / ((height / 100) ** 2)
-        print(f"[DEBUG] Calculated BMI: {bmi:.2f}")
+        logger.debug("[DEBUG] Calculated BMI: %.2f", bmi)
 
         # Convert categorical values using mappings
         input_data = pd.DataFrame({
@@ -76,34 +86,35 @@ def predict():
             "ExerciseFrequency": [exercise_frequency_mapping.get(exercise_frequency, 1)]
         })
 
-        print("[DEBUG] Prepared input data for prediction:", input_data)
+        logger.debug("[DEBUG] Prepared input data for prediction: %s", input_data)
 
         # Predict therapies using the models
         prediction_results = {}
         for therapy, model in best_models.items():
             try:
-                prediction = model.predict(input_data)
+                with stage_timer('inference'):
+                    prediction = model.predict(input_data)
                 prediction_results[therapy] = prediction[0]
-                print(f"[DEBUG] Prediction for {therapy}: {prediction[0]}")
+                logger.debug("[DEBUG] Prediction for %s: %s", therapy, prediction[0])
             except Exception as e:
-                print(f"[ERROR] Error predicting {therapy}: {e}")
+                logger.error("[ERROR] Error predicting %s: %s", therapy, e)
                 prediction_results[therapy] = "Error"
 
         # Generate additional therapy recommendations
-        additional_therapies = generate_additional_therapies(
-            dataset, prediction_results, health_condition, age, bmi
-        )
+        with stage_timer('dataset_filter'):
+            additional_therapies = generate_additional_therapies(
+                dataset, prediction_results, health_condition, age, bmi
+            )
 
         # Combine predictions and additional therapies
         all_recommendations = list(set(prediction_results.values())) + additional_therapies
 
-        print("[DEBUG] Final Therapy Recommendations:", all_recommendations)
+        logger.debug("[DEBUG] Final Therapy Recommendations: %s", all_recommendations)
 
         return jsonify({"recommendations": all_recommendations})
 
     except Exception as e:
-        print("[ERROR] Error during prediction:", str(e))
-        print(traceback.format_exc())  # Print detailed error traceback
+        logger.exception("[ERROR] Error during prediction: %s", e)  # Logs detailed error traceback
         return jsonify({"error": "An error occurred while processing your request."})
 
 
@@ -112,7 +123,7 @@ def generate_additional_therapies(dataset, predictions, health_condition, age, b
     Generate additional therapy recommendations based on health condition, age, and BMI.
     """
     if dataset.empty:
-        print("[ERROR] Dataset is empty. Additional therapies cannot be generated.")
+        logger.error("[ERROR] Dataset is empty. Additional therapies cannot be generated.")
         return []
 
     try:
@@ -123,21 +134,23 @@ def generate_additional_therapies(dataset, predictions, health_condition, age, b
         #     (dataset['BMI'].between(bmi - 2, bmi + 2))
         # ]
 
-        # print("[DEBUG] Filtered dataset for recommendations. Shape:", filtered_data.shape)
+        # logger.debug("[DEBUG] Filtered dataset for recommendations. Shape:", filtered_data.shape)
         
         # Extract all unique therapy recommendations from the filtered dataset
         therapy_columns = ['Therapy1', 'Therapy2', 'Therapy3']
         all_therapies = pd.unique(filtered_data[therapy_columns].values.ravel())
 
-        print("[DEBUG] Extracted Additional Therapies:", all_therapies)
+        logger.debug("[DEBUG] Extracted Additional Therapies: %s", all_therapies)
 
         # Exclude already predicted therapies
         # additional_therapies = [therapy for therapy in all_therapies if therapy not in predictions.values()]
         # return additional_therapies[:5]  
 
     except Exception as e:
-        print(f"[ERROR] Error during additional therapy generation: {e}")
+        logger.error("[ERROR] Error during additional therapy generation: %s", e)
         return []
 
+mark_ready(logger)
+
 if __name__ == "__main__":
     app.run(debug=True, port=5001)
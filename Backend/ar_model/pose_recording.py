@@ -0,0 +1,143 @@
+"""Append-only binary recording of AR pose sessions.
+
+Each recorded session is three files in the recording directory:
+
+    <session>.json            header: format version, therapy key, landmark count
+    <session>.landmarks.f32   float32, fixed stride of 33 x 3 (x, y, z) per frame
+    <session>.timestamps.f64  float64 unix timestamp per frame
+
+Frames in which no pose was detected are stored as NaN so the timeline keeps
+its shape. Both data files are raw little-endian arrays, so a session can be
+memory-mapped as a (frames, 33, 3) array without parsing. A frame is 396 bytes
+of landmarks plus 8 bytes of timestamp, compared with several KB per JPEG frame.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+NUM_LANDMARKS = 33
+FRAME_SHAPE = (NUM_LANDMARKS, 3)
+LANDMARK_DTYPE = np.dtype('<f4')
+TIMESTAMP_DTYPE = np.dtype('<f8')
+FRAME_BYTES = NUM_LANDMARKS * 3 * LANDMARK_DTYPE.itemsize
+LOCK_STRIPES = 64
+
+SESSION_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class RecordingError(ValueError):
+    """Raised for invalid session ids or inconsistent recordings."""
+
+
+def _paths(directory, session_id):
+    base = os.path.join(directory, session_id)
+    return base + '.json', base + '.landmarks.f32', base + '.timestamps.f64'
+
+
+def landmarks_to_frame(landmarks):
+    """Pack the `/process_frame` landmark dicts into a (33, 3) float32 array (NaN if none)."""
+    frame = np.full(FRAME_SHAPE, np.nan, dtype=LANDMARK_DTYPE)
+    for i, lm in enumerate(landmarks[:NUM_LANDMARKS]):
+        frame[i] = (lm['x'], lm['y'], lm['z'])
+    return frame
+
+
+class SessionRecorder:
+    """Appends frames to per-session files; safe to share between request threads."""
+
+    def __init__(self, directory, therapy_keys=None):
+        """`therapy_keys`, if given, is the set of therapy keys frames may be recorded for."""
+        self.directory = directory
+        self.therapy_keys = set(therapy_keys) if therapy_keys is not None else None
+        # Striped locks: bounded memory however many sessions are recorded
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        os.makedirs(directory, exist_ok=True)
+
+    def _lock_for(self, session_id):
+        return self._locks[hash(session_id) % LOCK_STRIPES]
+
+    def append(self, session_id, therapy_key, landmarks, timestamp=None):
+        if not isinstance(session_id, str) or not SESSION_ID_PATTERN.match(session_id):
+            raise RecordingError(f'Invalid session id: {session_id!r}')
+        if self.therapy_keys is not None and therapy_key not in self.therapy_keys:
+            raise RecordingError(f'Unknown therapy key: {therapy_key!r}')
+        header_path, landmarks_path, timestamps_path = _paths(self.directory, session_id)
+        frame = landmarks_to_frame(landmarks)
+        timestamp = np.array([time.time() if timestamp is None else timestamp], dtype=TIMESTAMP_DTYPE)
+
+        with self._lock_for(session_id):
+            if not os.path.exists(header_path):
+                with open(header_path, 'w') as f:
+                    json.dump({
+                        'format_version': FORMAT_VERSION,
+                        'session_id': session_id,
+                        'therapy_key': therapy_key,
+                        'num_landmarks': NUM_LANDMARKS,
+                        'created': float(timestamp[0]),
+                    }, f)
+            else:
+                _repair(landmarks_path, timestamps_path)
+            # Landmarks first: a crash between the two writes leaves an extra
+            # landmark frame, which _repair() trims before the next append.
+            with open(landmarks_path, 'ab') as f:
+                f.write(frame.tobytes())
+            with open(timestamps_path, 'ab') as f:
+                f.write(timestamp.tobytes())
+
+
+def _repair(landmarks_path, timestamps_path):
+    """Trim a crashed session so both files hold the same number of whole frames.
+
+    An orphan or torn landmark frame would otherwise shift every later frame
+    against its timestamp. Costs two stat() calls when the files are consistent.
+    """
+    timestamps_size = os.path.getsize(timestamps_path) if os.path.exists(timestamps_path) else 0
+    landmarks_size = os.path.getsize(landmarks_path) if os.path.exists(landmarks_path) else 0
+    frames = min(timestamps_size // TIMESTAMP_DTYPE.itemsize, landmarks_size // FRAME_BYTES)
+    for path, size, expected in ((timestamps_path, timestamps_size, frames * TIMESTAMP_DTYPE.itemsize),
+                                 (landmarks_path, landmarks_size, frames * FRAME_BYTES)):
+        if size != expected:
+            with open(path, 'r+b') as f:
+                f.truncate(expected)
+
+
+class RecordedSession:
+    """A memory-mapped recorded session."""
+
+    def __init__(self, session_id, therapy_key, timestamps, landmarks):
+        self.session_id = session_id
+        self.therapy_key = therapy_key
+        self.timestamps = timestamps
+        self.landmarks = landmarks
+
+    def __len__(self):
+        return len(self.timestamps)
+
+
+def _memmap(path, dtype, shape_tail=()):
+    item_size = dtype.itemsize * int(np.prod(shape_tail, dtype=np.int64) if shape_tail else 1)
+    count = os.path.getsize(path) // item_size
+    if count == 0:
+        return np.empty((0,) + shape_tail, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,) + shape_tail)
+
+
+def load_session(directory, session_id):
+    header_path, landmarks_path, timestamps_path = _paths(directory, session_id)
+    with open(header_path) as f:
+        header = json.load(f)
+    if header.get('format_version') != FORMAT_VERSION:
+        raise RecordingError(f"Unsupported recording format {header.get('format_version')} for {session_id}")
+    timestamps = _memmap(timestamps_path, TIMESTAMP_DTYPE)
+    landmarks = _memmap(landmarks_path, LANDMARK_DTYPE, FRAME_SHAPE)
+    count = min(len(timestamps), len(landmarks))
+    return RecordedSession(session_id, header.get('therapy_key'), timestamps[:count], landmarks[:count])
+
+
+def list_sessions(directory):
+    return sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
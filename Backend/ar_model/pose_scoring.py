@@ -0,0 +1,127 @@
+"""Offline pose scoring and landmark smoothing.
+
+Vectorized port of the angle comparison in the app's ARAvatarScreen
+(`comparePoses`): for each of the therapy's four joint angles the user's 2D
+angle is compared with the reference pose from all_therapy_data.json, and a
+frame's match percentage is the share of angles within the tolerance. It works
+on whole (frames, 33, 3) arrays so recorded sessions can be scored at full speed.
+"""
+import json
+import os
+
+import numpy as np
+
+ANGLE_TOLERANCE = 10
+PERFECT_MATCH = 80
+GREAT_MATCH = 60
+
+LANDMARK_INDEX = {
+    'nose': 0,
+    'left_shoulder': 11,
+    'right_shoulder': 12,
+    'left_elbow': 13,
+    'right_elbow': 14,
+    'left_wrist': 15,
+    'right_wrist': 16,
+    'left_hip': 23,
+    'right_hip': 24,
+    'left_knee': 25,
+    'right_knee': 26,
+    'left_ankle': 27,
+    'right_ankle': 28,
+}
+
+DEFAULT_ANGLE_DEFINITIONS = [
+    ('left_shoulder', 'left_elbow', 'left_wrist'),
+    ('right_shoulder', 'right_elbow', 'right_wrist'),
+    ('left_hip', 'left_knee', 'left_ankle'),
+    ('right_hip', 'right_knee', 'right_ankle'),
+]
+
+POSE_ANGLE_DEFINITIONS = {
+    'Downward_Dog': [
+        ('left_shoulder', 'left_hip', 'left_knee'),
+        ('right_shoulder', 'right_hip', 'right_knee'),
+        ('left_hip', 'left_knee', 'left_ankle'),
+        ('right_hip', 'right_knee', 'right_ankle'),
+    ],
+    'Triangle_Pose': [
+        ('left_shoulder', 'left_hip', 'left_knee'),
+        ('right_shoulder', 'right_hip', 'right_knee'),
+        ('left_hip', 'left_knee', 'left_ankle'),
+        ('right_hip', 'right_knee', 'right_ankle'),
+    ],
+    'Warrior_II': [
+        ('left_shoulder', 'left_elbow', 'left_wrist'),
+        ('right_shoulder', 'right_elbow', 'right_wrist'),
+        ('left_hip', 'left_knee', 'left_ankle'),
+        ('right_hip', 'right_knee', 'right_ankle'),
+    ],
+}
+
+TARGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'arPoseLandmarks', 'all_therapy_data.json')
+
+
+def load_targets(path=TARGETS_PATH):
+    """Return {therapy_key: {landmark_name: (x, y, z)}} from all_therapy_data.json."""
+    with open(path) as f:
+        therapies = json.load(f)
+    return {
+        key: {lm['name']: (lm['x'], lm['y'], lm['z']) for lm in therapy['landmarks']}
+        for key, therapy in therapies.items()
+    }
+
+
+def _angles(p1, p2, p3):
+    """2D angle in degrees at p2 for arrays of shape (..., 2+); 0 where a segment has zero length."""
+    v1 = p1[..., :2] - p2[..., :2]
+    v2 = p3[..., :2] - p2[..., :2]
+    m1 = np.hypot(v1[..., 0], v1[..., 1])
+    m2 = np.hypot(v2[..., 0], v2[..., 1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos = np.clip((v1 * v2).sum(axis=-1) / (m1 * m2), -1.0, 1.0)
+    angles = np.degrees(np.arccos(cos))
+    return np.where((m1 == 0) | (m2 == 0), 0.0, angles)
+
+
+def score_frames(frames, therapy_key, targets, tolerance=ANGLE_TOLERANCE):
+    """Match percentage per frame for a (frames, 33, 3) array; undetected (NaN) frames score 0."""
+    frames = np.asarray(frames, dtype=np.float32)
+    target = targets.get(therapy_key)
+    if target is None:
+        raise KeyError(f'No reference landmarks for therapy {therapy_key!r}')
+    definitions = POSE_ANGLE_DEFINITIONS.get(therapy_key, DEFAULT_ANGLE_DEFINITIONS)
+
+    matches = np.zeros(len(frames), dtype=np.float32)
+    for j1, j2, j3 in definitions:
+        user = _angles(frames[:, LANDMARK_INDEX[j1]], frames[:, LANDMARK_INDEX[j2]], frames[:, LANDMARK_INDEX[j3]])
+        reference = _angles(*(np.asarray(target[name], dtype=np.float32) for name in (j1, j2, j3)))
+        with np.errstate(invalid='ignore'):
+            matches += np.abs(user - reference) <= tolerance
+    return matches / len(definitions) * 100
+
+
+def ema_smooth(frames, alpha):
+    """Exponentially smooth landmarks over time; NaN (undetected) frames pass through untouched."""
+    frames = np.asarray(frames, dtype=np.float32)
+    if alpha >= 1:
+        return frames
+    smoothed = np.array(frames, copy=True)
+    state = None
+    for i, frame in enumerate(frames):
+        if np.isnan(frame).any():
+            continue
+        state = frame if state is None else alpha * frame + (1 - alpha) * state
+        smoothed[i] = state
+    return smoothed
+
+
+def summarize(match_percentages, detected):
+    total = len(match_percentages)
+    return {
+        'frames': total,
+        'detected_frames': int(np.count_nonzero(detected)),
+        'mean_match': round(float(match_percentages.mean()), 2) if total else 0.0,
+        'perfect_frames': int(np.count_nonzero(match_percentages >= PERFECT_MATCH)),
+        'great_frames': int(np.count_nonzero(match_percentages >= GREAT_MATCH)),
+    }
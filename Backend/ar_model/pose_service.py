@@ -4,23 +4,47 @@ import mediapipe as mp
 import base64
 import numpy as np
 import logging
+import os
+import sys
 import traceback
 
-# Set up logging for debugging and error tracking
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from instrumentation import configure_logging, stage_timer, count_event, register_metrics_endpoint, mark_ready
+from pose_recording import SessionRecorder, RecordingError
+from pose_scoring import load_targets
+
+# Set up logging for debugging and error tracking (level from LOG_LEVEL, switchable via /log_level)
+logger = configure_logging(__name__)
 
 app = Flask(__name__)
+register_metrics_endpoint(app, service='pose')
 mp_pose = mp.solutions.pose
 
 # Initialize MediaPipe Pose model with adjusted confidence thresholds
 pose = mp_pose.Pose(min_detection_confidence=0.6, min_tracking_confidence=0.7)
 
+# Opt-in session recording: enabled by POSE_RECORDING_DIR, requested per frame with
+# {"record": true, "sessionId": ..., "therapyKey": ...}
+POSE_RECORDING_DIR = os.environ.get('POSE_RECORDING_DIR')
+recorder = SessionRecorder(POSE_RECORDING_DIR, therapy_keys=load_targets()) if POSE_RECORDING_DIR else None
+
+def record_frame(data, landmarks):
+    if recorder is None or not data.get('record'):
+        return
+    try:
+        with stage_timer('pose_record'):
+            recorder.append(data.get('sessionId'), data.get('therapyKey'), landmarks)
+    except RecordingError as e:
+        logger.warning('[WARN] Frame not recorded: %s', e)
+    except Exception as e:
+        # Recording is best-effort: never fail the frame response because of it
+        logger.error('[ERROR] Failed to record frame: %s', e)
+
 @app.route('/process_frame', methods=['POST'])
 def process_frame():
     try:
         # Log incoming request
-        logger.info('[DEBUG] Received request to process frame')
+        logger.debug('[DEBUG] Received request to process frame')
         
         # Get JSON data from request
         data = request.json
@@ -33,8 +57,9 @@ def process_frame():
         logger.debug('[DEBUG] Frame base64 length: %d', len(frame_base64))
 
         # Decode base64 string to image
-        frame = base64.b64decode(frame_base64)
-        image = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
+        with stage_timer('pose_decode'):
+            frame = base64.b64decode(frame_base64)
+            image = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
         if image is None:
             logger.error('[ERROR] Failed to decode image')
             return jsonify({'error': 'Failed to decode image'}), 400
@@ -43,12 +68,14 @@ def process_frame():
         logger.debug('[DEBUG] Image decoded, shape: %s', image.shape)
 
         # Preprocess image to enhance contrast and brightness
-        image = cv2.convertScaleAbs(image, alpha=1.2, beta=20)  # Increase contrast and brightness
+        with stage_timer('pose_preprocess'):
+            image = cv2.convertScaleAbs(image, alpha=1.2, beta=20)  # Increase contrast and brightness
+            # Convert image to RGB for MediaPipe processing
+            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
         logger.debug('[DEBUG] Image preprocessed with contrast alpha=1.2 and brightness beta=20')
 
-        # Convert image to RGB for MediaPipe processing
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = pose.process(image_rgb)
+        with stage_timer('pose_inference'):
+            results = pose.process(image_rgb)
 
         # Process pose detection results
         if results.pose_landmarks:
@@ -61,16 +88,19 @@ def process_frame():
                 }
                 for i, lm in enumerate(results.pose_landmarks.landmark)
             ]
-            logger.info('[DEBUG] Pose landmarks detected: %d', len(landmarks))
+            logger.debug('[DEBUG] Pose landmarks detected: %d', len(landmarks))
             
             # Log specific landmarks to verify coordinates after mirroring
-            for lm in landmarks:
-                if lm['name'] in ['landmark_11', 'landmark_12']:  # left_shoulder, right_shoulder
+            if logger.isEnabledFor(logging.DEBUG):
+                for lm in (landmarks[11], landmarks[12]):  # left_shoulder, right_shoulder
                     logger.debug('[DEBUG] Mirrored %s: x=%.3f, y=%.3f, z=%.3f', lm['name'], lm['x'], lm['y'], lm['z'])
             
+            record_frame(data, landmarks)
             return jsonify({'landmarks': landmarks})
         else:
-            logger.warning('[WARN] No pose landmarks detected')
+            logger.debug('[WARN] No pose landmarks detected')
+            count_event('pose_not_detected')
+            record_frame(data, [])
             return jsonify({'landmarks': []})
 
     except Exception as e:
@@ -79,6 +109,8 @@ def process_frame():
         logger.error('[ERROR] Traceback: %s', traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+mark_ready(logger)
+
 if __name__ == '__main__':
     logger.info('[INFO] Starting pose detection service on http://0.0.0.0:5002')
     app.run(host='0.0.0.0', port=5002, debug=True)
\ No newline at end of file
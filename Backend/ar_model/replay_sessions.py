@@ -0,0 +1,73 @@
+"""Replay recorded AR pose sessions through the scoring and smoothing code.
+
+Sessions recorded by pose_service.py (see pose_recording.py) are
+memory-mapped and scored offline as fast as the CPU allows, so pose processing
+can be benchmarked and tuned on real workloads without a camera.
+
+Usage:
+    python replay_sessions.py                          # every session in ./recordings
+    python replay_sessions.py --dir recordings --session abc123 --alpha 0.5
+    python replay_sessions.py --alpha 1 0.7 0.5 0.3    # compare smoothing strengths
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from pose_recording import list_sessions, load_session
+from pose_scoring import ANGLE_TOLERANCE, ema_smooth, load_targets, score_frames, summarize
+
+
+def replay(session, targets, alpha, tolerance):
+    start = time.perf_counter()
+    frames = ema_smooth(session.landmarks, alpha)
+    match_percentages = score_frames(frames, session.therapy_key, targets, tolerance)
+    elapsed = time.perf_counter() - start
+
+    detected = ~np.isnan(session.landmarks).any(axis=(1, 2))
+    result = summarize(match_percentages, detected)
+    duration = float(session.timestamps[-1] - session.timestamps[0]) if len(session) > 1 else 0.0
+    result.update({
+        'session': session.session_id,
+        'therapy_key': session.therapy_key,
+        'alpha': alpha,
+        'recorded_seconds': round(duration, 2),
+        'replay_seconds': round(elapsed, 6),
+        'frames_per_second': round(len(session) / elapsed, 1) if elapsed > 0 else None,
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded pose sessions through offline scoring.')
+    parser.add_argument('--dir', default='recordings', help='Recording directory')
+    parser.add_argument('--session', nargs='*', help='Session ids to replay (default: all)')
+    parser.add_argument('--alpha', type=float, nargs='+', default=[1.0],
+                        help='EMA smoothing factor(s); 1 disables smoothing')
+    parser.add_argument('--tolerance', type=float, default=ANGLE_TOLERANCE, help='Angle tolerance in degrees')
+    parser.add_argument('--json', action='store_true', help='Print one JSON object per result')
+    args = parser.parse_args()
+
+    targets = load_targets()
+    for session_id in args.session or list_sessions(args.dir):
+        session = load_session(args.dir, session_id)
+        if len(session) == 0:
+            print(f'[WARN] Session {session_id} has no frames')
+            continue
+        if session.therapy_key not in targets:
+            print(f'[WARN] Session {session_id} has unknown therapy key {session.therapy_key!r}; skipped')
+            continue
+        for alpha in args.alpha:
+            result = replay(session, targets, alpha, args.tolerance)
+            if args.json:
+                print(json.dumps(result))
+            else:
+                print(f"[INFO] {result['session']} ({result['therapy_key']}) alpha={alpha}: "
+                      f"{result['frames']} frames, {result['detected_frames']} detected, "
+                      f"mean match {result['mean_match']}%, perfect {result['perfect_frames']}, "
+                      f"{result['frames_per_second']} frames/s")
+
+
+if __name__ == '__main__':
+    main()
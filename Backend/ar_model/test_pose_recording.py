@@ -0,0 +1,85 @@
+"""Tests for pose session recording and crash recovery.
+
+Run from this directory:  python -m pytest -q test_pose_recording.py
+"""
+import os
+
+import numpy as np
+import pytest
+
+from pose_recording import FRAME_BYTES, NUM_LANDMARKS, RecordingError, SessionRecorder, load_session
+
+THERAPY = 'Warrior_II'
+
+
+def landmarks(value):
+    return [{'x': value, 'y': value + 0.5, 'z': -value} for _ in range(NUM_LANDMARKS)]
+
+
+def data_paths(directory, session_id):
+    base = os.path.join(directory, session_id)
+    return base + '.landmarks.f32', base + '.timestamps.f64'
+
+
+def test_round_trip_keeps_undetected_frames(tmp_path):
+    recorder = SessionRecorder(str(tmp_path))
+    recorder.append('s1', THERAPY, landmarks(1.0), timestamp=10.0)
+    recorder.append('s1', THERAPY, [], timestamp=11.0)
+    recorder.append('s1', THERAPY, landmarks(3.0), timestamp=12.0)
+
+    session = load_session(str(tmp_path), 's1')
+    assert len(session) == 3
+    assert session.therapy_key == THERAPY
+    assert list(session.timestamps) == [10.0, 11.0, 12.0]
+    assert session.landmarks.shape == (3, NUM_LANDMARKS, 3)
+    assert np.isnan(session.landmarks[1]).all()
+    assert session.landmarks[2, 0].tolist() == [3.0, 3.5, -3.0]
+
+
+@pytest.mark.parametrize('landmark_tail, timestamp_tail', [
+    (FRAME_BYTES, 0),        # orphan landmark frame: crash between the two writes
+    (FRAME_BYTES // 2, 0),   # torn landmark write
+    (FRAME_BYTES, 3),        # orphan landmark frame plus torn timestamp
+])
+def test_append_after_crash_realigns_frames(tmp_path, landmark_tail, timestamp_tail):
+    recorder = SessionRecorder(str(tmp_path))
+    for i in range(2):
+        recorder.append('s1', THERAPY, landmarks(float(i)), timestamp=float(i))
+    landmarks_path, timestamps_path = data_paths(str(tmp_path), 's1')
+    with open(landmarks_path, 'ab') as f:
+        f.write(b'\x7f' * landmark_tail)
+    with open(timestamps_path, 'ab') as f:
+        f.write(b'\x7f' * timestamp_tail)
+
+    for i in range(2, 4):
+        recorder.append('s1', THERAPY, landmarks(float(i)), timestamp=float(i))
+
+    session = load_session(str(tmp_path), 's1')
+    assert list(session.timestamps) == [0.0, 1.0, 2.0, 3.0]
+    assert session.landmarks[:, 0, 0].tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert os.path.getsize(landmarks_path) == 4 * FRAME_BYTES
+
+
+def test_load_trims_orphan_frame_without_repair(tmp_path):
+    recorder = SessionRecorder(str(tmp_path))
+    recorder.append('s1', THERAPY, landmarks(1.0), timestamp=1.0)
+    landmarks_path, _ = data_paths(str(tmp_path), 's1')
+    with open(landmarks_path, 'ab') as f:
+        f.write(np.zeros(NUM_LANDMARKS * 3, dtype='<f4').tobytes())
+
+    session = load_session(str(tmp_path), 's1')
+    assert len(session) == 1
+    assert session.landmarks.shape == (1, NUM_LANDMARKS, 3)
+
+
+@pytest.mark.parametrize('session_id', [12345, None, '', '../escape', 'a' * 65])
+def test_invalid_session_ids_are_rejected(tmp_path, session_id):
+    with pytest.raises(RecordingError):
+        SessionRecorder(str(tmp_path)).append(session_id, THERAPY, landmarks(1.0))
+
+
+def test_unknown_therapy_key_is_rejected(tmp_path):
+    recorder = SessionRecorder(str(tmp_path), therapy_keys={THERAPY})
+    with pytest.raises(RecordingError):
+        recorder.append('s1', 'Not_A_Pose', landmarks(1.0))
+    assert not os.listdir(str(tmp_path))
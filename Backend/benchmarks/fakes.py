@@ -0,0 +1,144 @@
+"""Local stand-ins for Firebase, Google Translate and Google Speech.
+
+`install_fakes()` registers fake `firebase_admin`, `google.cloud.translate_v2`
+and `google.cloud.speech_v1p1beta1` modules in `sys.modules` so the Flask
+services can be imported and benchmarked without credentials or network
+access. Each fake call sleeps for a configurable latency to approximate the
+real dependency.
+"""
+import itertools
+import os
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'chatbot_model'))
+from in_memory_db import InMemoryDatabase  # noqa: E402
+
+
+class FakeLatency:
+    """Per-dependency latency (seconds) injected by the fakes."""
+
+    def __init__(self, firebase=0.0, translate=0.0, speech=0.0):
+        self.firebase = firebase
+        self.translate = translate
+        self.speech = speech
+
+
+latency = FakeLatency()
+
+# Profiles returned for bench users; anything else gets an empty snapshot
+USER_PROFILES = {
+    'bench-user-diabetes': {'age': 45, 'gender': 'Female', 'healthCondition': 'Diabetes'},
+    'bench-user-hypertension': {'age': 55, 'gender': 'Male', 'healthCondition': 'Hypertension'},
+    'bench-user-general': {'age': None, 'gender': None, 'healthCondition': 'general'},
+}
+
+# Transcript returned by the fake Speech client, set by the benchmark runner
+speech_transcripts = itertools.cycle(['How can I control my blood sugar naturally?'])
+
+
+def _sleep(seconds):
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+class FakeDatabase(InMemoryDatabase):
+    """In-memory Realtime Database seeded with the bench profiles; sleeps `latency.firebase` per call."""
+
+    def __init__(self):
+        super().__init__({'users': USER_PROFILES})
+
+    def _pause(self):
+        _sleep(latency.firebase)
+
+
+def _build_firebase_admin():
+    database = FakeDatabase()
+
+    firebase_admin = types.ModuleType('firebase_admin')
+    credentials = types.ModuleType('firebase_admin.credentials')
+    db = types.ModuleType('firebase_admin.db')
+    firestore = types.ModuleType('firebase_admin.firestore')
+
+    credentials.Certificate = lambda path: {'path': path}
+    db.reference = database.reference
+    db.database = database
+    firestore.client = lambda *args, **kwargs: types.SimpleNamespace(collection=lambda name: None)
+
+    firebase_admin.initialize_app = lambda *args, **kwargs: types.SimpleNamespace(name='[DEFAULT]')
+    firebase_admin.credentials = credentials
+    firebase_admin.db = db
+    firebase_admin.firestore = firestore
+    return {
+        'firebase_admin': firebase_admin,
+        'firebase_admin.credentials': credentials,
+        'firebase_admin.db': db,
+        'firebase_admin.firestore': firestore,
+    }
+
+
+class FakeTranslateClient:
+    def translate(self, text, target_language='si'):
+        _sleep(latency.translate)
+        return {'translatedText': text, 'detectedSourceLanguage': 'en'}
+
+
+class _FakeOperation:
+    def __init__(self, transcript):
+        self._transcript = transcript
+
+    def result(self, timeout=None):
+        _sleep(latency.speech)
+        alternative = types.SimpleNamespace(transcript=self._transcript, confidence=0.95)
+        return types.SimpleNamespace(results=[types.SimpleNamespace(alternatives=[alternative])])
+
+
+class FakeSpeechClient:
+    def long_running_recognize(self, config=None, audio=None):
+        return _FakeOperation(next(speech_transcripts))
+
+
+def _build_google_cloud():
+    translate_v2 = types.ModuleType('google.cloud.translate_v2')
+    translate_v2.Client = FakeTranslateClient
+
+    speech = types.ModuleType('google.cloud.speech_v1p1beta1')
+    speech.SpeechClient = FakeSpeechClient
+    speech.RecognitionAudio = lambda **kwargs: types.SimpleNamespace(**kwargs)
+    speech.SpeechContext = lambda **kwargs: types.SimpleNamespace(**kwargs)
+
+    class RecognitionConfig(types.SimpleNamespace):
+        AudioEncoding = types.SimpleNamespace(LINEAR16=1)
+
+    speech.RecognitionConfig = RecognitionConfig
+
+    modules = {
+        'google.cloud.translate_v2': translate_v2,
+        'google.cloud.speech_v1p1beta1': speech,
+    }
+    try:
+        import google.cloud as google_cloud
+    except ImportError:
+        google = sys.modules.get('google') or types.ModuleType('google')
+        google.__path__ = getattr(google, '__path__', [])
+        google_cloud = types.ModuleType('google.cloud')
+        google_cloud.__path__ = []
+        google.cloud = google_cloud
+        modules['google'] = google
+        modules['google.cloud'] = google_cloud
+    google_cloud.translate_v2 = translate_v2
+    google_cloud.speech_v1p1beta1 = speech
+    return modules
+
+
+def install_fakes(firebase_latency=0.0, translate_latency=0.0, speech_latency=0.0, transcripts=None):
+    """Register the fake modules; must run before the service module is imported."""
+    global speech_transcripts
+    latency.firebase = firebase_latency
+    latency.translate = translate_latency
+    latency.speech = speech_latency
+    if transcripts:
+        speech_transcripts = itertools.cycle(transcripts)
+    sys.modules.update(_build_firebase_admin())
+    sys.modules.update(_build_google_cloud())
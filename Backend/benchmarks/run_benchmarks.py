@@ -0,0 +1,425 @@
+"""Load-test and benchmark harness for the CeylonCare Flask services.
+
+Every target runs in its own subprocess against the service's Flask app
+(in-process test client), with Firebase, Translate and Speech replaced by the
+latency-injecting fakes in `fakes.py`. Results report throughput, p50/p95/p99
+latency, errors (including 200 responses with an `error` body), the
+`*_fallback` events counted during the run and the worker's RSS, and are
+compared against `baseline.json`. Responses are closed and deferred work
+(history writes) is drained before the wall time is taken.
+
+    python run_benchmarks.py                          # all targets, compare to baseline
+    python run_benchmarks.py --targets chat_en chat_si
+    python run_benchmarks.py --update-baseline        # store current results as baseline
+    python run_benchmarks.py --firebase-latency-ms 80 --translate-latency-ms 120
+"""
+import argparse
+import base64
+import glob
+import io
+import json
+import math
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+CHATBOT_DIR = os.path.join(BACKEND_DIR, 'chatbot_model')
+AR_DIR = os.path.join(BACKEND_DIR, 'ar_model')
+POSE_IMAGES_DIR = os.path.join(AR_DIR, 'arPoseLandmarks', 'pose_images')
+DATASET_PATH = os.path.join(CHATBOT_DIR, 'dataset_chatbot_updated.csv')
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+# Settings that may differ from the baseline without invalidating the comparison
+UNCOMPARED_CONFIG = {'targets', 'tolerance'}
+
+# target name -> (service directory, module name, endpoint)
+TARGETS = {
+    'chat_en': (CHATBOT_DIR, 'chatbot', '/chat'),
+    'chat_si': (CHATBOT_DIR, 'chatbot', '/chat'),
+    'transcribe': (CHATBOT_DIR, 'chatbot', '/transcribe'),
+    'process_frame': (AR_DIR, 'pose_service', '/process_frame'),
+    'ar_predict': (AR_DIR, 'ar', '/predict'),
+}
+
+# Service executors holding work deferred past the response (history writes)
+DEFERRED_EXECUTORS = ('io_executor',)
+FALLBACK_EVENT_PATTERN = re.compile(r'^ceyloncare_events_total\{[^}]*event="([^"]*_fallback)"[^}]*\} (\S+)$')
+
+BENCH_USERS = ['bench-user-diabetes', 'bench-user-hypertension', 'bench-user-general']
+
+
+def load_queries(language, count, seed):
+    """Sample `count` queries of one language from the chatbot dataset."""
+    import csv
+
+    with open(DATASET_PATH, newline='', encoding='utf-8') as f:
+        queries = [row['Query'] for row in csv.DictReader(f) if row['Language'] == language and row['Query']]
+    rng = random.Random(seed)
+    return [rng.choice(queries) for _ in range(count)]
+
+
+def synthetic_wav(seconds=3.0, sample_rate=16000, seed=0):
+    """Render a mono 16-bit WAV of a voiced-like tone plus noise."""
+    rng = random.Random(seed)
+    frames = bytearray()
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        sample = 0.4 * math.sin(2 * math.pi * 180 * t) + 0.2 * math.sin(2 * math.pi * 360 * t) + 0.05 * rng.uniform(-1, 1)
+        frames += int(max(-1.0, min(1.0, sample)) * 32767).to_bytes(2, 'little', signed=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def render_frames(width):
+    """JPEG-encode each reference pose image at a camera-like width, base64 encoded."""
+    import cv2
+
+    frames = []
+    for path in sorted(glob.glob(os.path.join(POSE_IMAGES_DIR, '*.jpg'))):
+        image = cv2.imread(path)
+        if image is None:
+            continue
+        height = int(image.shape[0] * width / image.shape[1])
+        image = cv2.resize(image, (width, height))
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        if ok:
+            frames.append(base64.b64encode(encoded.tobytes()).decode('ascii'))
+    if not frames:
+        raise RuntimeError(f'No pose images found in {POSE_IMAGES_DIR}')
+    return frames
+
+
+def build_requests(target, count, args):
+    """Return a list of callables taking a test client and returning a response."""
+    rng = random.Random(args.seed)
+    if target in ('chat_en', 'chat_si'):
+        language = 'English' if target == 'chat_en' else 'Sinhala'
+        language_code = 'en-US' if target == 'chat_en' else 'si-LK'
+        queries = load_queries(language, count, args.seed)
+        return [
+            (lambda client, q=q, user=rng.choice(BENCH_USERS): client.post('/chat', json={
+                'message': q, 'userId': user, 'languageCode': language_code}))
+            for q in queries
+        ]
+    if target == 'transcribe':
+        clips = [synthetic_wav(seconds=args.clip_seconds, seed=i) for i in range(4)]
+        return [
+            (lambda client, clip=clips[i % len(clips)], i=i: client.post('/transcribe', data={
+                'audio': (io.BytesIO(clip), f'bench_{i}.wav'),
+                'userId': rng.choice(BENCH_USERS),
+                'languageCode': 'en-US'}, content_type='multipart/form-data'))
+            for i in range(count)
+        ]
+    if target == 'process_frame':
+        frames = render_frames(args.frame_width)
+        return [
+            (lambda client, frame=frames[i % len(frames)]: client.post('/process_frame', json={'frame': frame}))
+            for i in range(count)
+        ]
+    if target == 'ar_predict':
+        conditions = ['Diabetes', 'Hypertension', 'Healthy', 'Both']
+        return [
+            (lambda client, payload={
+                'age': rng.randint(20, 75),
+                'gender': rng.choice(['Male', 'Female']),
+                'health_condition': rng.choice(conditions),
+                'weight': rng.randint(50, 100),
+                'height': rng.randint(150, 190),
+                'exercise_frequency': rng.choice(['Daily', 'Weekly', 'Rarely']),
+            }: client.post('/predict', json=payload))
+            for _ in range(count)
+        ]
+    raise ValueError(f'Unknown target: {target}')
+
+
+def send_request(send, client):
+    """Send one request and close the response, so `call_on_close` work is scheduled like in production.
+
+    Returns (status, is_error); a 200 whose JSON body carries an `error` key
+    (as ar.py /predict returns) counts as an error.
+    """
+    response = send(client)
+    try:
+        body = response.get_json(silent=True)
+        is_error = response.status_code >= 400 or (isinstance(body, dict) and 'error' in body)
+        return response.status_code, is_error
+    finally:
+        response.close()
+
+
+def drain_deferred_work(service):
+    """Wait until every task queued on the service's executors has finished."""
+    for name in DEFERRED_EXECUTORS:
+        executor = getattr(service, name, None)
+        if executor is None:
+            continue
+        # A barrier per worker thread: each one blocks a thread until all have started,
+        # so every task queued before them has been picked up; then wait for them
+        workers = executor._max_workers
+        barrier = threading.Barrier(workers)
+        for future in [executor.submit(barrier.wait) for _ in range(workers)]:
+            future.result()
+
+
+def fallback_events(client):
+    """Current `*_fallback` event counts from the service's /metrics endpoint."""
+    counts = {}
+    for line in client.get('/metrics').get_data(as_text=True).splitlines():
+        match = FALLBACK_EVENT_PATTERN.match(line)
+        if match:
+            counts[match.group(1)] = counts.get(match.group(1), 0) + int(float(match.group(2)))
+    return counts
+
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(math.ceil(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_worker(target, args):
+    """Import the target service with fakes installed and drive its Flask app."""
+    sys.path.insert(0, BENCH_DIR)
+    from fakes import install_fakes
+
+    service_dir, module_name, _ = TARGETS[target]
+    transcripts = load_queries('English', 50, args.seed) if target == 'transcribe' else None
+    install_fakes(
+        firebase_latency=args.firebase_latency_ms / 1000.0,
+        translate_latency=args.translate_latency_ms / 1000.0,
+        speech_latency=args.speech_latency_ms / 1000.0,
+        transcripts=transcripts,
+    )
+
+    os.chdir(service_dir)
+    sys.path.insert(0, service_dir)
+    import_start = time.perf_counter()
+    service = __import__(module_name)
+    import_seconds = time.perf_counter() - import_start
+    rss_after_import = current_rss_mb()
+
+    requests = build_requests(target, args.warmup + args.requests, args)
+    warmup, measured = requests[:args.warmup], requests[args.warmup:]
+
+    client = service.app.test_client()
+    for send in warmup:
+        send_request(send, client)
+    drain_deferred_work(service)
+    events_before = fallback_events(client)
+
+    def timed(send):
+        start = time.perf_counter()
+        status, is_error = send_request(send, service.app.test_client())
+        return time.perf_counter() - start, status, is_error
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(timed, measured))
+    # Deferred work (the chat history write) is part of the cost of serving the requests
+    drain_deferred_work(service)
+    wall_seconds = time.perf_counter() - wall_start
+    events_after = fallback_events(client)
+
+    latencies = sorted(latency for latency, _, _ in results)
+    errors = sum(1 for _, _, is_error in results if is_error)
+    fallbacks = {event: count - events_before.get(event, 0)
+                 for event, count in events_after.items() if count > events_before.get(event, 0)}
+    ms = lambda value: round(value * 1000.0, 3) if value is not None else None
+    return {
+        'target': target,
+        'requests': len(results),
+        'concurrency': args.concurrency,
+        'errors': errors,
+        'fallbacks': fallbacks,
+        'throughput_rps': round(len(results) / wall_seconds, 2) if wall_seconds > 0 else None,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'import_seconds': round(import_seconds, 3),
+        'rss_after_import_mb': round(rss_after_import, 1),
+        'rss_mb': round(current_rss_mb(), 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def run_target(target, args):
+    """Run one target in a fresh interpreter so RSS and import cost are isolated."""
+    command = [sys.executable, os.path.abspath(__file__), '--worker', target] + worker_args(args)
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        print(f'[ERROR] Benchmark target {target} failed:\n{completed.stderr[-4000:]}', file=sys.stderr)
+        return {'target': target, 'failed': True}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def worker_args(args):
+    return [
+        '--requests', str(args.requests),
+        '--warmup', str(args.warmup),
+        '--concurrency', str(args.concurrency),
+        '--seed', str(args.seed),
+        '--firebase-latency-ms', str(args.firebase_latency_ms),
+        '--translate-latency-ms', str(args.translate_latency_ms),
+        '--speech-latency-ms', str(args.speech_latency_ms),
+        '--clip-seconds', str(args.clip_seconds),
+        '--frame-width', str(args.frame_width),
+    ]
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return human-readable regressions: new failures, errors or fallbacks, and p95/throughput/RSS beyond `tolerance`.
+
+    Errors and fallbacks are checked first because requests that fail fast or
+    fall back would otherwise show up as a latency improvement.
+    """
+    regressions = []
+    for target, result in results.items():
+        base = baseline.get('results', {}).get(target)
+        if not base or base.get('failed'):
+            continue
+        if result.get('failed'):
+            regressions.append(f'{target}: benchmark failed')
+            continue
+        if result['errors'] > base.get('errors', 0):
+            regressions.append(f"{target}: errors {base.get('errors', 0)} -> {result['errors']}")
+        base_fallbacks = base.get('fallbacks', {})
+        for event, count in sorted(result.get('fallbacks', {}).items()):
+            if count > base_fallbacks.get(event, 0):
+                regressions.append(f"{target}: {event} {base_fallbacks.get(event, 0)} -> {count}")
+        if base.get('p95_ms') and result['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{target}: p95 {base['p95_ms']}ms -> {result['p95_ms']}ms")
+        if base.get('throughput_rps') and result['throughput_rps'] < base['throughput_rps'] * (1 - tolerance):
+            regressions.append(f"{target}: throughput {base['throughput_rps']} -> {result['throughput_rps']} req/s")
+        if base.get('peak_rss_mb') and result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{target}: peak RSS {base['peak_rss_mb']}MB -> {result['peak_rss_mb']}MB")
+    return regressions
+
+
+def config_mismatches(config, baseline_config):
+    """Settings (injected latencies, load, inputs) that differ from the baseline's, as readable lines."""
+    return [
+        f'{key}: baseline {baseline_config.get(key)!r}, now {config.get(key)!r}'
+        for key in sorted(set(config) | set(baseline_config))
+        if key not in UNCOMPARED_CONFIG and config.get(key) != baseline_config.get(key)
+    ]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_table(results):
+    header = f"{'target':<15}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'fallbk':>8}{'RSS MB':>10}"
+    print(header)
+    print('-' * len(header))
+    for target, r in results.items():
+        if r.get('failed'):
+            print(f'{target:<15}{"FAILED":>10}')
+            continue
+        print(f"{target:<15}{r['throughput_rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['errors']:>8}{sum(r.get('fallbacks', {}).values()):>8}{r['peak_rss_mb']:>10}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the CeylonCare Flask services with local fakes.')
+    parser.add_argument('--targets', nargs='+', choices=sorted(TARGETS), default=list(TARGETS))
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--firebase-latency-ms', type=float, default=40.0)
+    parser.add_argument('--translate-latency-ms', type=float, default=80.0)
+    parser.add_argument('--speech-latency-ms', type=float, default=300.0)
+    parser.add_argument('--clip-seconds', type=float, default=3.0)
+    parser.add_argument('--frame-width', type=int, default=640)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='Allowed relative regression before failing')
+    parser.add_argument('--output', help='Also write the results JSON to this path')
+    parser.add_argument('--worker', choices=sorted(TARGETS), help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args)))
+        return 0
+
+    results = {target: run_target(target, args) for target in args.targets}
+    report = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {key: value for key, value in vars(args).items() if key not in ('worker', 'update_baseline', 'output', 'baseline')},
+        'results': results,
+    }
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'[INFO] Baseline written to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'[INFO] No baseline at {args.baseline}; run with --update-baseline to create one')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    mismatches = config_mismatches(report['config'], baseline.get('config', {}))
+    if mismatches:
+        print(f"[ERROR] Benchmark settings differ from baseline {baseline.get('revision')}; not comparing:")
+        for line in mismatches:
+            print(f'  {line}')
+        return 2
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"[WARNING] Regressions vs baseline {baseline.get('revision')}:")
+        for line in regressions:
+            print(f'  {line}')
+        return 1
+    print(f"[INFO] No regressions vs baseline {baseline.get('revision')} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
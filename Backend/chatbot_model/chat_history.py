@@ -0,0 +1,172 @@
+"""Chat history storage with a per-user index and cursor pagination.
+
+Every exchange is written with one multi-path update to both
+`chats/{pushId}` (the existing flat log) and `user_chats/{userId}/{pushId}`,
+so reading a user's history touches only that user's node. Pages are ordered
+by `timestamp`, newest first; the cursor returned with a page is opaque
+(`<timestamp>_<pushId>` of its oldest item) and is passed back to fetch the
+next, older page. The most recent page per user is cached in-process and
+invalidated when this process writes a new exchange for that user.
+
+Server-side ordering needs this Realtime Database rule:
+
+    "user_chats": {"$userId": {".indexOn": ["timestamp"]}}
+"""
+import logging
+import threading
+from contextlib import nullcontext
+import time
+from collections import OrderedDict
+
+from in_memory_db import SERVER_TIMESTAMP, generate_push_id
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be parsed."""
+
+
+def encode_cursor(timestamp, push_id):
+    return f'{timestamp}_{push_id}'
+
+
+def decode_cursor(cursor):
+    timestamp, sep, push_id = (cursor or '').partition('_')
+    if not sep or not push_id:
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}')
+    try:
+        return int(timestamp), push_id
+    except ValueError:
+        raise InvalidCursor(f'Invalid cursor: {cursor!r}')
+
+
+class ChatHistory:
+    """Reads and writes chat history through `user_chats/{userId}`.
+
+    `db_provider` returns a `firebase_admin.db`-compatible module (or an
+    `InMemoryDatabase`); it is called on every operation so Firebase can be
+    initialized lazily. `on_timestamp_fallback` is called when a write has to
+    fall back to a client-side timestamp, `on_cache_hit` when a page is served
+    from the cache, and `read_timer()` returns a context manager wrapped around
+    each database read (cache hits are not timed).
+    """
+
+    def __init__(self, db_provider, cache_size=1024, cache_ttl=30.0, on_timestamp_fallback=None,
+                 on_cache_hit=None, read_timer=None):
+        self._db_provider = db_provider
+        self._on_timestamp_fallback = on_timestamp_fallback
+        self._on_cache_hit = on_cache_hit
+        self._read_timer = read_timer or nullcontext
+        self._cache_size = cache_size
+        self._cache_ttl = cache_ttl
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def save(self, user_id, query, response, language_code, recommendation=''):
+        """Write one exchange to `chats` and the user's index atomically; returns the push id."""
+        db = self._db_provider()
+        push_id = generate_push_id()
+        record = {
+            'userId': user_id,
+            'query': query,
+            'response': response,
+            'recommendation': recommendation,
+            'language': language_code,
+        }
+        try:
+            self._write(db, user_id, push_id, dict(record, timestamp=SERVER_TIMESTAMP))
+        except Exception as e:
+            logger.warning(f'[WARNING] Chat history write failed: {e}, retrying with client-side timestamp')
+            if self._on_timestamp_fallback is not None:
+                self._on_timestamp_fallback()
+            self._write(db, user_id, push_id, dict(record, timestamp=int(time.time() * 1000)))
+        self.invalidate(user_id)
+        return push_id
+
+    def _write(self, db, user_id, push_id, record):
+        db.reference('/').update({
+            f'chats/{push_id}': record,
+            f'user_chats/{user_id}/{push_id}': record,
+        })
+
+    def page(self, user_id, limit=DEFAULT_PAGE_SIZE, cursor=None):
+        """Return `{'items': [...newest first], 'nextCursor': str or None}`."""
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        if cursor is None:
+            cached = self._cached_page(user_id, limit)
+            if cached is not None:
+                if self._on_cache_hit is not None:
+                    self._on_cache_hit()
+                return cached
+
+        cursor_key = decode_cursor(cursor) if cursor is not None else None
+        db = self._db_provider()
+        with self._read_timer():
+            if cursor_key is not None:
+                entries = self._entries_before(db, user_id, cursor_key, limit + 1)
+            else:
+                entries = list((self._query(db, user_id).limit_to_last(limit + 1).get() or {}).items())
+
+        has_more = len(entries) > limit
+        entries = entries[-limit:]
+        items = [dict(value, id=key) for key, value in reversed(entries)]
+        oldest_key, oldest_value = entries[0] if entries else (None, None)
+        page = {
+            'items': items,
+            'nextCursor': encode_cursor(_timestamp(oldest_value), oldest_key) if has_more else None,
+        }
+        if cursor is None:
+            self._store_page(user_id, limit, page)
+        return page
+
+    @staticmethod
+    def _query(db, user_id):
+        return db.reference('user_chats').child(user_id).order_by_child('timestamp')
+
+    def _entries_before(self, db, user_id, cursor_key, wanted):
+        """Up to `wanted` entries strictly older than `cursor_key`, oldest first.
+
+        `end_at` is inclusive and cannot break ties by key, so the window also
+        holds the cursor row and any newer rows sharing its timestamp. It is
+        doubled until enough older rows survive or the window reaches the start
+        of the user's history.
+        """
+        window = wanted + 1
+        while True:
+            snapshot = self._query(db, user_id).end_at(cursor_key[0]).limit_to_last(window).get() or {}
+            entries = [(key, value) for key, value in snapshot.items()
+                       if (_timestamp(value), key) < cursor_key]
+            if len(entries) >= wanted or len(snapshot) < window:
+                return entries[-wanted:]
+            window *= 2
+
+    def _cached_page(self, user_id, limit):
+        with self._cache_lock:
+            entry = self._cache.get(user_id)
+            if entry is None:
+                return None
+            stored_at, cached_limit, page = entry
+            if cached_limit != limit or time.monotonic() - stored_at > self._cache_ttl:
+                return None
+            self._cache.move_to_end(user_id)
+            return page
+
+    def _store_page(self, user_id, limit, page):
+        with self._cache_lock:
+            self._cache[user_id] = (time.monotonic(), limit, page)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._cache_lock:
+            self._cache.pop(user_id, None)
+
+
+def _timestamp(value):
+    timestamp = value.get('timestamp') if isinstance(value, dict) else None
+    return timestamp if isinstance(timestamp, int) else 0
@@ -1,110 +1,217 @@
 import os
-import pickle
+import sys
 import re
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-import numpy as np
-import pandas as pd
-import logging
-from firebase_admin import credentials, initialize_app, db
-import firebase_admin
-from google.cloud import translate_v2 as translate
-from google.cloud import speech_v1p1beta1 as speech
-from pydub import AudioSegment
-import datetime
-
-# Setup logging
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from instrumentation import (configure_logging, stage_timer, count_event, register_metrics_endpoint,
+                             startup_phase, mark_ready)
+
+# Heavy imports are profiled per phase; Firebase, Translate, Speech and pydub
+# are loaded lazily (see lazy_init) so text-only replicas become ready sooner.
+with startup_phase('import:flask'):
+    from flask import Flask, request, jsonify, after_this_request, g, has_request_context
+    from flask_cors import CORS
+with startup_phase('import:pandas'):
+    import numpy as np
+    import pandas as pd
+with startup_phase('import:tensorflow'):
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+from response_index import normalize
+from model_bundle import BundleManager
+from chat_history import ChatHistory, InvalidCursor, DEFAULT_PAGE_SIZE
+
+# Setup logging (level from LOG_LEVEL, switchable at runtime via /log_level)
+logger = configure_logging(__name__)
 
 app = Flask(__name__)
 CORS(app)
+# Guards /admin/*, POST /log_level and other users' /history
+ADMIN_TOKEN = os.environ.get('CHATBOT_ADMIN_TOKEN')
+register_metrics_endpoint(app, service='chatbot', admin_token=ADMIN_TOKEN)
+
+# Per-dependency timeouts (seconds) for the async chat pipeline
+FIREBASE_HTTP_TIMEOUT = float(os.environ.get('CHATBOT_FIREBASE_TIMEOUT', 5))
+PROFILE_TIMEOUT = float(os.environ.get('CHATBOT_PROFILE_TIMEOUT', 2))
+INFERENCE_TIMEOUT = float(os.environ.get('CHATBOT_INFERENCE_TIMEOUT', 5))
+TRANSLATE_TIMEOUT = float(os.environ.get('CHATBOT_TRANSLATE_TIMEOUT', 3))
+
+# 'first' returns the first matching dataset row; 'nearest' picks the row whose query
+# is semantically closest to the user's (needs an index built with response_index.py)
+RESPONSE_MODE = os.environ.get('CHATBOT_RESPONSE_MODE', 'first')
+
+DEFAULT_PROFILE = {'age': None, 'gender': None, 'healthCondition': 'general'}
+
+# Pool for blocking Firebase I/O (profile reads, deferred history writes)
+io_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='chat-io')
+# Separate pool for inference, so reads that keep running after their timeout
+# cannot hold every thread and push inference past INFERENCE_TIMEOUT
+INFERENCE_WORKERS = int(os.environ.get('CHATBOT_INFERENCE_WORKERS', 2))
+inference_executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix='chat-inference')
+# Translation gets its own pool too: a profile read that timed out keeps its
+# io_executor thread for up to FIREBASE_HTTP_TIMEOUT and must not delay it
+TRANSLATE_WORKERS = int(os.environ.get('CHATBOT_TRANSLATE_WORKERS', 4))
+translate_executor = ThreadPoolExecutor(max_workers=TRANSLATE_WORKERS, thread_name_prefix='chat-translate')
+
+# Comma-separated lazy dependencies to load in the background once the service is
+# ready (firebase, translate, speech, pydub); anything else loads on first use
+PRELOAD = [name.strip() for name in os.environ.get('CHATBOT_PRELOAD', 'firebase,translate').split(',') if name.strip()]
+
+_lazy_values = {}
+_lazy_lock = threading.Lock()
+
+def lazy_init(name, loader):
+    """Run `loader` once (thread-safe), record it as a startup phase and cache the result."""
+    value = _lazy_values.get(name)
+    if value is None:
+        with _lazy_lock:
+            value = _lazy_values.get(name)
+            if value is None:
+                with startup_phase(name):
+                    value = loader()
+                _lazy_values[name] = value
+    return value
+
+def init_firebase():
+    try:
+        import firebase_admin
+        from firebase_admin import credentials, db
+        cred = credentials.Certificate('../credentials/firebase_serviceAccountKey.json')
+        firebase_admin.initialize_app(cred, {
+            'databaseURL': 'https://ceyloncare-bdefa-default-rtdb.firebaseio.com/',
+            'httpTimeout': FIREBASE_HTTP_TIMEOUT
+        })
+        logger.debug('[DEBUG] Firebase app initialized successfully')
+        return db
+    except Exception as e:
+        logger.error(f'[ERROR] Failed to initialize Firebase app: {e}')
+        raise
 
-# Initialize Firebase
-try:
-    cred = credentials.Certificate('../credentials/firebase_serviceAccountKey.json')
-    initialize_app(cred, {'databaseURL': 'https://ceyloncare-bdefa-default-rtdb.firebaseio.com/'})
-    logger.debug('[DEBUG] Firebase app initialized successfully')
-except Exception as e:
-    logger.error(f'[ERROR] Failed to initialize Firebase app: {e}')
-    raise
+def init_translate_client():
+    try:
+        from google.cloud import translate_v2 as translate
+        client = translate.Client()
+        logger.debug('[DEBUG] Google Translate client initialized successfully')
+        return client
+    except Exception as e:
+        logger.error(f'[ERROR] Failed to initialize Google Translate client: {e}')
+        raise
 
-# Initialize Google Translate
-try:
-    translate_client = translate.Client()
-    logger.debug('[DEBUG] Google Translate client initialized successfully')
-except Exception as e:
-    logger.error(f'[ERROR] Failed to initialize Google Translate client: {e}')
-    raise
+def import_speech():
+    from google.cloud import speech_v1p1beta1 as speech
+    return speech
+
+def import_firebase_auth():
+    from firebase_admin import auth
+    return auth
+
+def import_audio_segment():
+    from pydub import AudioSegment
+    return AudioSegment
+
+def firebase_db():
+    return lazy_init('init:firebase', init_firebase)
+
+def firebase_auth():
+    firebase_db()
+    return lazy_init('import:firebase_auth', import_firebase_auth)
+
+def translate_client():
+    return lazy_init('init:translate', init_translate_client)
+
+def speech_module():
+    return lazy_init('import:speech', import_speech)
+
+def audio_segment():
+    return lazy_init('import:pydub', import_audio_segment)
+
+chat_history = ChatHistory(
+    firebase_db,
+    cache_ttl=float(os.environ.get('CHATBOT_HISTORY_CACHE_TTL', '30')),
+    on_timestamp_fallback=lambda: count_event('history_client_timestamp_fallback'),
+    on_cache_hit=lambda: count_event('history_cache_hit'),
+    read_timer=lambda: stage_timer('firebase_read'),
+)
+
+LAZY_LOADERS = {
+    'firebase': firebase_db,
+    'translate': translate_client,
+    'speech': speech_module,
+    'pydub': audio_segment,
+}
+
+def preload_dependencies():
+    for name in PRELOAD:
+        loader = LAZY_LOADERS.get(name)
+        if loader is None:
+            logger.warning(f'[WARNING] Unknown CHATBOT_PRELOAD entry: {name}')
+            continue
+        try:
+            loader()
+        except Exception as e:
+            logger.error(f'[ERROR] Background preload of {name} failed: {e}')
 
-# Load model and assets
+# Load model and assets from the active bundle (bundles/CURRENT), or the flat
+# artifacts in this directory if no bundle has been published yet. With
+# nearest-neighbour mode the bundle also carries the response index.
+MAX_SEQ_LENGTH = 50
 try:
-    model = load_model('best_chatbot_model.keras', compile=False)
-    with open('tokenizer.pkl', 'rb') as f:
-        tokenizer = pickle.load(f)
-    with open('label_encoder.pkl', 'rb') as f:
-        label_encoder = pickle.load(f)
-    data_df = pd.read_csv('dataset_chatbot_updated.csv')
-    data_df['Age'] = pd.to_numeric(data_df['Age'], errors='coerce')
-    MAX_SEQ_LENGTH = 50
+    bundle_manager = BundleManager(response_mode=RESPONSE_MODE)
+    with startup_phase('load:model_bundle'):
+        bundle_manager.load_initial()
     logger.debug('[DEBUG] Model and assets loaded successfully')
 except Exception as e:
     logger.error(f'[ERROR] Failed to load model or assets: {e}')
     raise
 
+BUNDLE_WATCH_INTERVAL = float(os.environ.get('CHATBOT_BUNDLE_WATCH_INTERVAL', 0))
+if BUNDLE_WATCH_INTERVAL > 0:
+    bundle_manager.start_watcher(BUNDLE_WATCH_INTERVAL)
+
+mark_ready(logger)
+if PRELOAD:
+    threading.Thread(target=preload_dependencies, name='chatbot-preload', daemon=True).start()
+
 def is_sinhala_text(text):
     sinhala_pattern = re.compile(r'[\u0D80-\u0DFF]')
     return bool(sinhala_pattern.search(text))
 
 def get_user_profile(user_id):
     try:
-        ref = db.reference('users').child(user_id)
-        snapshot = ref.get()
-        return snapshot or {'age': None, 'gender': None, 'healthCondition': 'general'}
+        ref = firebase_db().reference('users').child(user_id)
+        with stage_timer('firebase_read'):
+            snapshot = ref.get()
+        return snapshot or dict(DEFAULT_PROFILE)
     except Exception as e:
         logger.error(f'[ERROR] Failed to fetch user profile: {e}')
-        return {'age': None, 'gender': None, 'healthCondition': 'general'}
+        return dict(DEFAULT_PROFILE)
 
 def save_chat_history(user_id, query, response, language_code, recommendation=''):
-    try:
-        ref = db.reference('chats').push({
-            'userId': user_id,
-            'query': query,
-            'response': response,
-            'recommendation': recommendation,
-            'language': language_code,
-            'timestamp': firebase_admin.db.ServerValue.TIMESTAMP
-        })
-        logger.debug(f'[DEBUG] Chat saved successfully, key: {ref.key}')
-    except Exception as e:
-        logger.warning(f'[WARNING] ServerValue failed: {e}, using client-side timestamp')
-        ref = db.reference('chats').push({
-            'userId': user_id,
-            'query': query,
-            'response': response,
-            'recommendation': recommendation,
-            'language': language_code,
-            'timestamp': datetime.datetime.now().isoformat()
-        })
-        logger.debug(f'[DEBUG] Chat saved with client-side timestamp, key: {ref.key}')
+    with stage_timer('firebase_write'):
+        write_chat_history(user_id, query, response, language_code, recommendation)
+
+def write_chat_history(user_id, query, response, language_code, recommendation=''):
+    push_id = chat_history.save(user_id, query, response, language_code, recommendation)
+    logger.debug('[DEBUG] Chat saved successfully, key: %s', push_id)
 
 def convert_audio_to_required_format(input_path, output_path):
     try:
-        audio = AudioSegment.from_file(input_path)
-        audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
-        audio.export(output_path, format='wav')
-        logger.debug(f'[DEBUG] Converted audio to 16kHz, mono, 16-bit WAV: {output_path}')
+        with stage_timer('audio_decode'):
+            audio = audio_segment().from_file(input_path)
+            audio = audio.set_frame_rate(16000).set_channels(1).set_sample_width(2)
+            audio.export(output_path, format='wav')
+        logger.debug('[DEBUG] Converted audio to 16kHz, mono, 16-bit WAV: %s', output_path)
     except Exception as e:
         logger.error(f'[ERROR] Failed to convert audio: {e}')
         raise
 
 def get_audio_duration(audio_path):
     try:
-        audio = AudioSegment.from_file(audio_path)
+        audio = audio_segment().from_file(audio_path)
         duration = len(audio) / 1000.0
-        logger.debug(f'[DEBUG] Audio duration: {duration} seconds')
+        logger.debug('[DEBUG] Audio duration: %s seconds', duration)
         return duration
     except Exception as e:
         logger.error(f'[ERROR] Failed to get audio duration: {e}')
@@ -112,11 +219,11 @@ def get_audio_duration(audio_path):
 
 def validate_audio_file(audio_path):
     try:
-        audio = AudioSegment.from_file(audio_path)
+        audio = audio_segment().from_file(audio_path)
         channels = audio.channels
         frame_rate = audio.frame_rate
         sample_width = audio.sample_width * 8
-        logger.debug(f'[DEBUG] Audio validation - Channels: {channels}, Frame Rate: {frame_rate} Hz, Sample Width: {sample_width} bits')
+        logger.debug('[DEBUG] Audio validation - Channels: %s, Frame Rate: %s Hz, Sample Width: %s bits', channels, frame_rate, sample_width)
         if channels != 1 or frame_rate != 16000 or sample_width != 16:
             logger.error('[ERROR] Audio format mismatch - Expected: 1 channel, 16000 Hz, 16-bit')
             return False
@@ -142,7 +249,8 @@ def transcribe_audio(audio_path, language_code):
             logger.warning(f'[WARNING] Audio duration too short: {duration} seconds')
             return "Audio too short. Please record at least 2 seconds."
 
-        logger.debug(f'[DEBUG] Transcribing audio: {converted_audio_path}, language: {language_code}')
+        logger.debug('[DEBUG] Transcribing audio: %s, language: %s', converted_audio_path, language_code)
+        speech = speech_module()
         client = speech.SpeechClient()
         with open(converted_audio_path, 'rb') as audio_file:
             content = audio_file.read()
@@ -175,15 +283,16 @@ def transcribe_audio(audio_path, language_code):
             enable_word_time_offsets=True,
         )
 
-        operation = client.long_running_recognize(config=config, audio=audio)
-        response = operation.result(timeout=90)
+        with stage_timer('speech_recognize'):
+            operation = client.long_running_recognize(config=config, audio=audio)
+            response = operation.result(timeout=90)
         if not response.results:
             logger.warning('[WARNING] No transcription results returned')
             return "Could not understand the audio. Please speak clearly, reduce background noise, or try again."
 
         transcript = response.results[0].alternatives[0].transcript
         confidence = response.results[0].alternatives[0].confidence
-        logger.debug(f'[DEBUG] Transcription successful: {transcript}, Confidence: {confidence}')
+        logger.debug('[DEBUG] Transcription successful: %s, Confidence: %s', transcript, confidence)
         return transcript
     except Exception as e:
         logger.error(f'[ERROR] Transcription error: {e}')
@@ -191,29 +300,68 @@ def transcribe_audio(audio_path, language_code):
     finally:
         if os.path.exists(converted_audio_path):
             os.remove(converted_audio_path)
-            logger.debug(f'[DEBUG] Cleaned up converted audio file: {converted_audio_path}')
-
-def chatbot_predict(query, language_code, user_id, age=None, gender=None, health_condition=None):
-    logger.debug(f'[DEBUG] chatbot_predict inputs - query: "{query}", language_code: "{language_code}", user_id: "{user_id}", age: {age}, gender: "{gender}", health_condition: "{health_condition}"')
+            logger.debug('[DEBUG] Cleaned up converted audio file: %s', converted_audio_path)
+
+def request_bundle():
+    """Active bundle, pinned on `flask.g` so one request uses (and reports) a single version."""
+    if not has_request_context():
+        return bundle_manager.current
+    if 'model_bundle' not in g:
+        g.model_bundle = bundle_manager.current
+    return g.model_bundle
+
+def predict_intent(bundle, query):
+    """Return (intent, query embedding); the embedding is None unless nearest-neighbour retrieval is active."""
+    with stage_timer('tokenize'):
+        seq = bundle.tokenizer.texts_to_sequences([query])
+        padded_seq = pad_sequences(seq, maxlen=MAX_SEQ_LENGTH)
+    with stage_timer('inference'):
+        if bundle.query_encoder is not None:
+            embedding, probabilities = bundle.query_encoder.predict(padded_seq, verbose=0)
+            query_vector = normalize(embedding)[0]
+        else:
+            probabilities = bundle.model.predict(padded_seq, verbose=0)
+            query_vector = None
+    prediction = np.argmax(probabilities, axis=1)
+    return bundle.label_encoder.inverse_transform(prediction)[0], query_vector
 
-    profile = get_user_profile(user_id)
-    age = age or profile['age']
-    gender = gender or profile['gender']
-    health_condition = health_condition or profile['healthCondition'].lower()
+def resolve_profile(profile, age=None, gender=None, health_condition=None):
+    age = age or profile.get('age')
+    gender = gender or profile.get('gender')
+    health_condition = health_condition or (profile.get('healthCondition') or 'general').lower()
 
     try:
         age = float(age) if age is not None else None
     except (ValueError, TypeError):
         logger.warning(f'[WARNING] Invalid age value: {age}, setting to None')
         age = None
+    return age, gender, health_condition
+
+def detect_target_language(query, language_code):
+    return 'Sinhala' if language_code == 'si-LK' or is_sinhala_text(query) else 'English'
+
+def no_match_result(target_language, bundle):
+    return {
+        'response': "මම ඔබේ ප්‍රශ්නයට උපදෙස් සොයා ගත නොහැකි විය." if target_language == 'Sinhala' else "I couldn't find advice for your query.",
+        'recommendation': '',
+        'modelVersion': bundle.version
+    }
+
+def select_response(bundle, intent, target_language, age, gender, health_condition, query_vector=None):
+    with stage_timer('dataset_filter'):
+        filtered_df = filter_dataset(bundle.data_df, intent, target_language, age, gender, health_condition)
+    if filtered_df.empty:
+        return None
 
-    target_language = 'Sinhala' if language_code == 'si-LK' or is_sinhala_text(query) else 'English'
-    seq = tokenizer.texts_to_sequences([query])
-    padded_seq = pad_sequences(seq, maxlen=MAX_SEQ_LENGTH)
-    prediction = np.argmax(model.predict(padded_seq), axis=1)
-    intent = label_encoder.inverse_transform(prediction)[0]
-    logger.debug(f'[DEBUG] Predicted intent: {intent}, target_language: {target_language}')
+    row = filtered_df.index[0]
+    if query_vector is not None:
+        with stage_timer('retrieval'):
+            nearest_row = bundle.response_index.nearest(intent, query_vector, filtered_df.index.to_numpy())
+        if nearest_row is not None:
+            row = nearest_row
+    return bundle.data_df.at[row, 'Response'], bundle.data_df.at[row, 'Recommendation (Condition)']
 
+def filter_dataset(data_df, intent, target_language, age, gender, health_condition):
     filtered_df = data_df[(data_df['Intent'] == intent) & (data_df['Language'] == target_language)]
     if age and not pd.isna(age):
         filtered_df = filtered_df[pd.to_numeric(filtered_df['Age'], errors='coerce').abs().sub(age).abs() <= 10]
@@ -222,32 +370,119 @@ def chatbot_predict(query, language_code, user_id, age=None, gender=None, health
     if health_condition and health_condition != 'general':
         specific_df = filtered_df[filtered_df['Health Condition'] == health_condition]
         filtered_df = specific_df if not specific_df.empty else filtered_df
+    return filtered_df
 
-    if filtered_df.empty:
-        result = {
-            'response': "මම ඔබේ ප්‍රශ්නයට උපදෙස් සොයා ගත නොහැකි විය." if target_language == 'Sinhala' else "I couldn't find advice for your query.",
-            'recommendation': ''
-        }
-        logger.debug(f'[DEBUG] No matching responses found: {result}')
-        return result
+def translate_recommendation(recommendation):
+    with stage_timer('translate'):
+        translation = translate_client().translate(recommendation, target_language='si')
+    return translation['translatedText']
 
-    response = filtered_df['Response'].iloc[0]
-    recommendation = filtered_df['Recommendation (Condition)'].iloc[0]
+def chatbot_predict(query, language_code, user_id, age=None, gender=None, health_condition=None):
+    logger.debug('[DEBUG] chatbot_predict inputs - query: "%s", language_code: "%s", user_id: "%s", age: %s, gender: "%s", health_condition: "%s"', query, language_code, user_id, age, gender, health_condition)
 
+    bundle = request_bundle()
+    profile = get_user_profile(user_id)
+    age, gender, health_condition = resolve_profile(profile, age, gender, health_condition)
+
+    target_language = detect_target_language(query, language_code)
+    intent, query_vector = predict_intent(bundle, query)
+    logger.debug('[DEBUG] Predicted intent: %s, target_language: %s', intent, target_language)
+
+    selected = select_response(bundle, intent, target_language, age, gender, health_condition, query_vector)
+    if selected is None:
+        result = no_match_result(target_language, bundle)
+        logger.debug('[DEBUG] No matching responses found: %s', result)
+        return result
+
+    response, recommendation = selected
     if target_language == 'Sinhala':
         try:
-            translation = translate_client.translate(recommendation, target_language='si')
-            recommendation = translation['translatedText']
+            recommendation = translate_recommendation(recommendation)
         except Exception as e:
             logger.error(f'[ERROR] Translation failed: {e}')
             recommendation = f"{recommendation} (Translation failed)"
 
-    result = {'response': response, 'recommendation': recommendation}
-    logger.debug(f'[DEBUG] Selected response: {result}')
+    result = {'response': response, 'recommendation': recommendation, 'modelVersion': bundle.version}
+    logger.debug('[DEBUG] Selected response: %s', result)
     return result
 
+async def run_blocking(label, timeout, func, *args, executor=io_executor):
+    """Run a blocking call on `executor`, raising asyncio.TimeoutError after `timeout` seconds."""
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(executor, func, *args), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f'[WARNING] {label} timed out after {timeout}s')
+        raise
+
+async def fetch_profile_async(user_id):
+    try:
+        return await run_blocking('Profile fetch', PROFILE_TIMEOUT, get_user_profile, user_id)
+    except Exception as e:
+        logger.error(f'[ERROR] Profile fetch failed, using default profile: {e}')
+        count_event('profile_fallback')
+        return dict(DEFAULT_PROFILE)
+
+async def chatbot_predict_async(query, language_code, user_id, age=None, gender=None, health_condition=None):
+    """Async variant of chatbot_predict.
+
+    The Firebase profile read is started first and overlaps tokenization and
+    inference; translation is only awaited for Sinhala replies. Each dependency
+    has its own timeout and falls back instead of failing the request.
+    """
+    bundle = request_bundle()
+    profile_task = asyncio.ensure_future(fetch_profile_async(user_id))
+    target_language = detect_target_language(query, language_code)
+
+    try:
+        intent, query_vector = await run_blocking('Intent inference', INFERENCE_TIMEOUT, predict_intent, bundle, query,
+                                                 executor=inference_executor)
+    except Exception as e:
+        logger.error(f'[ERROR] Intent inference failed: {e}')
+        count_event('inference_fallback')
+        # The canned no-match reply is not a real answer; keep it out of the user's history
+        g.skip_history = True
+        profile_task.cancel()
+        return no_match_result(target_language, bundle)
+    logger.debug('[DEBUG] Predicted intent: %s, target_language: %s', intent, target_language)
+
+    profile = await profile_task
+    age, gender, health_condition = resolve_profile(profile, age, gender, health_condition)
+
+    selected = select_response(bundle, intent, target_language, age, gender, health_condition, query_vector)
+    if selected is None:
+        return no_match_result(target_language, bundle)
+
+    response, recommendation = selected
+    if target_language == 'Sinhala':
+        try:
+            recommendation = await run_blocking('Translation', TRANSLATE_TIMEOUT, translate_recommendation, recommendation,
+                                                executor=translate_executor)
+        except Exception as e:
+            logger.error(f'[ERROR] Translation failed: {e}')
+            count_event('translate_fallback')
+            recommendation = f"{recommendation} (Translation failed)"
+
+    return {'response': response, 'recommendation': recommendation, 'modelVersion': bundle.version}
+
+def save_chat_history_after_response(user_id, query, response, language_code, recommendation=''):
+    """Defer the Firebase history write until the HTTP response has been sent."""
+    def submit_write():
+        future = io_executor.submit(save_chat_history, user_id, query, response, language_code, recommendation)
+        future.add_done_callback(log_history_write_failure)
+
+    @after_this_request
+    def schedule_write(http_response):
+        http_response.call_on_close(submit_write)
+        return http_response
+
+def log_history_write_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error(f'[ERROR] Failed to save chat history: {error}')
+
 @app.route('/chat', methods=['POST'])
-def chat():
+async def chat():
     data = request.get_json()
     message = data.get('message')
     user_id = data.get('userId')
@@ -259,8 +494,11 @@ def chat():
     if not message or not user_id:
         return jsonify({'error': 'Missing message or userId'}), 400
 
-    result = chatbot_predict(message, language_code, user_id, age, gender, health_condition)
-    save_chat_history(user_id, message, result['response'], language_code, result['recommendation'])
+    result = await chatbot_predict_async(message, language_code, user_id, age, gender, health_condition)
+    if g.get('skip_history'):
+        logger.debug('[DEBUG] Not saving fallback reply to chat history')
+    else:
+        save_chat_history_after_response(user_id, message, result['response'], language_code, result['recommendation'])
     return jsonify(result)
 
 @app.route('/transcribe', methods=['POST'])
@@ -284,24 +522,24 @@ def transcribe():
 
         audio_path = os.path.join('Uploads', audio_file.filename)
         os.makedirs('Uploads', exist_ok=True)
-        logger.debug(f'[DEBUG] Saving audio to: {audio_path}')
+        logger.debug('[DEBUG] Saving audio to: %s', audio_path)
         audio_file.save(audio_path)
 
         debug_path = os.path.join('Uploads', f'debug_{audio_file.filename}')
         audio_file.seek(0)
         with open(debug_path, 'wb') as f:
             f.write(audio_file.read())
-        logger.debug(f'[DEBUG] Saved debug audio to: {debug_path}')
+        logger.debug('[DEBUG] Saved debug audio to: %s', debug_path)
 
         transcript = transcribe_audio(audio_path, language_code)
-        logger.debug(f'[DEBUG] Transcription result: {transcript}')
+        logger.debug('[DEBUG] Transcription result: %s', transcript)
 
         try:
             os.remove(audio_path)
-            logger.debug(f'[DEBUG] Cleaned up audio file: {audio_path}')
+            logger.debug('[DEBUG] Cleaned up audio file: %s', audio_path)
             if os.path.exists(debug_path):
                 os.remove(debug_path)
-                logger.debug(f'[DEBUG] Cleaned up debug file: {debug_path}')
+                logger.debug('[DEBUG] Cleaned up debug file: %s', debug_path)
         except Exception as e:
             logger.warning(f'[WARNING] Failed to clean up audio file: {e}')
 
@@ -310,18 +548,79 @@ def transcribe():
             return jsonify({'error': transcript}), 500
 
         result = chatbot_predict(transcript, language_code, user_id, age, gender, health_condition)
-        logger.debug(f'[DEBUG] Chat result for transcript: {result}')
+        logger.debug('[DEBUG] Chat result for transcript: %s', result)
 
         save_chat_history(user_id, transcript, result['response'], language_code, result['recommendation'])
         return jsonify({
             'transcript': transcript,
             'response': result['response'],
-            'recommendation': result['recommendation']
+            'recommendation': result['recommendation'],
+            'modelVersion': result['modelVersion']
         })
     except Exception as e:
         logger.error(f'[ERROR] /transcribe endpoint failed: {e}')
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.after_request
+def add_model_version_header(response):
+    # Report the bundle that answered this request, not whatever is active now
+    bundle = g.get('model_bundle') or bundle_manager.current
+    if bundle is not None:
+        response.headers['X-Model-Version'] = bundle.version
+    return response
+
+def is_admin_request():
+    return bool(ADMIN_TOKEN) and request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+
+def authenticated_uid():
+    """Firebase uid from an `Authorization: Bearer <ID token>` header, or None if missing/invalid."""
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token:
+        return None
+    try:
+        return firebase_auth().verify_id_token(token).get('uid')
+    except Exception as e:
+        logger.warning(f'[WARNING] Rejected Firebase ID token: {e}')
+        return None
+
+@app.route('/history', methods=['GET'])
+def history():
+    user_id = request.args.get('userId')
+    if not user_id:
+        return jsonify({'error': 'Missing userId'}), 400
+    if not is_admin_request() and authenticated_uid() != user_id:
+        return jsonify({'error': 'Forbidden'}), 403
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    try:
+        page = chat_history.page(user_id, limit, request.args.get('cursor'))
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f'[ERROR] Failed to fetch chat history: {e}')
+        return jsonify({'error': 'Internal server error'}), 500
+    return jsonify(page)
+
+@app.route('/admin/reload', methods=['POST'])
+def admin_reload():
+    if not is_admin_request():
+        return jsonify({'error': 'Forbidden'}), 403
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    if version is not None and not bundle_manager.has_version(version):
+        return jsonify({'error': f'Unknown model version: {version}'}), 404
+    if bundle_manager.reloading:
+        return jsonify({'error': 'Reload already in progress', **bundle_manager.status()}), 409
+    logger.info('[INFO] Reload requested for chatbot model version %s', version or 'CURRENT')
+    bundle_manager.reload_in_background(version)
+    return jsonify({'status': 'reloading', 'requestedVersion': version, **bundle_manager.status()}), 202
+
+@app.route('/admin/model', methods=['GET'])
+def admin_model():
+    return jsonify(bundle_manager.status())
+
 if __name__ == '__main__':
     logger.debug('[DEBUG] Starting Flask server on port 5003')
     app.run(host='0.0.0.0', port=5003, debug=True)
\ No newline at end of file
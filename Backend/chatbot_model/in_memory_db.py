@@ -0,0 +1,201 @@
+"""In-memory stand-in for the `firebase_admin.db` module.
+
+Implements the subset of the Realtime Database API the chatbot uses
+(`reference`, `child`, `get`, `set`, `update` including multi-path updates,
+`push`, ordered queries with `order_by_child`/`order_by_key`, `start_at`,
+`end_at`, `limit_to_first`, `limit_to_last`, and the `{'.sv': 'timestamp'}`
+server-value sentinel the REST API resolves to the server time),
+so chat history code can run locally and in benchmarks without Firebase.
+
+    db = InMemoryDatabase()
+    history = ChatHistory(lambda: db)
+"""
+import copy
+import random
+import threading
+import time
+from collections import OrderedDict
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'
+# Resolved to the server's epoch milliseconds on write (firebase_admin.db has no ServerValue helper)
+SERVER_TIMESTAMP = {'.sv': 'timestamp'}
+
+
+def generate_push_id(now_ms=None, rng=random):
+    """Firebase-style push id: 8 chars of millisecond timestamp + 12 random chars, sortable by time."""
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    time_chars = []
+    for _ in range(8):
+        time_chars.append(PUSH_CHARS[now_ms % 64])
+        now_ms //= 64
+    return ''.join(reversed(time_chars)) + ''.join(rng.choice(PUSH_CHARS) for _ in range(12))
+
+
+def _resolve_server_values(value, now_ms):
+    if value == SERVER_TIMESTAMP:
+        return now_ms
+    if isinstance(value, dict):
+        return {key: _resolve_server_values(child, now_ms) for key, child in value.items()}
+    return value
+
+
+def _split(path):
+    return [part for part in (path or '').split('/') if part]
+
+
+class InMemoryDatabase:
+    """Thread-safe JSON tree; `latency` (seconds) is slept before every operation."""
+
+    def __init__(self, data=None, latency=0.0):
+        self.root = copy.deepcopy(data) if data else {}
+        self.latency = latency
+        self._lock = threading.RLock()
+
+    def reference(self, path='/'):
+        return InMemoryReference(self, _split(path))
+
+    def _pause(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _get(self, parts):
+        node = self.root
+        for part in parts:
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return copy.deepcopy(node)
+
+    def _set(self, parts, value):
+        if not parts:
+            self.root = value if isinstance(value, dict) else {}
+            return
+        node = self.root
+        for part in parts[:-1]:
+            child = node.get(part)
+            if not isinstance(child, dict):
+                child = node[part] = {}
+            node = child
+        if value is None:
+            node.pop(parts[-1], None)
+        else:
+            node[parts[-1]] = value
+
+
+class InMemoryReference:
+    def __init__(self, database, parts):
+        self._database = database
+        self._parts = list(parts)
+
+    @property
+    def key(self):
+        return self._parts[-1] if self._parts else None
+
+    @property
+    def path(self):
+        return '/' + '/'.join(self._parts)
+
+    def child(self, path):
+        return InMemoryReference(self._database, self._parts + _split(path))
+
+    def get(self):
+        self._database._pause()
+        with self._database._lock:
+            return self._database._get(self._parts)
+
+    def set(self, value):
+        self._database._pause()
+        now_ms = int(time.time() * 1000)
+        with self._database._lock:
+            self._database._set(self._parts, _resolve_server_values(copy.deepcopy(value), now_ms))
+
+    def update(self, value):
+        """Apply every `relative/path: value` pair atomically, like a Firebase multi-path update."""
+        if not isinstance(value, dict) or not value:
+            raise ValueError('Value argument must be a non-empty dictionary.')
+        self._database._pause()
+        now_ms = int(time.time() * 1000)
+        with self._database._lock:
+            for path, child in value.items():
+                self._database._set(self._parts + _split(path), _resolve_server_values(copy.deepcopy(child), now_ms))
+
+    def push(self, value=''):
+        ref = self.child(generate_push_id())
+        ref.set(value)
+        return ref
+
+    def order_by_child(self, path):
+        return InMemoryQuery(self, lambda key, value: _child_value(value, path))
+
+    def order_by_key(self):
+        return InMemoryQuery(self, lambda key, value: key)
+
+
+def _child_value(value, path):
+    node = value
+    for part in _split(path):
+        if not isinstance(node, dict):
+            return None
+        node = node.get(part)
+    return node
+
+
+def _sort_key(item):
+    # Firebase orders null < booleans < numbers < strings < objects, then by key
+    value, key = item
+    if value is None:
+        rank = 0
+    elif isinstance(value, bool):
+        rank = 1
+    elif isinstance(value, (int, float)):
+        rank = 2
+    elif isinstance(value, str):
+        rank = 3
+    else:
+        return (4, 0, key)
+    return (rank, value if rank else 0, key)
+
+
+class InMemoryQuery:
+    def __init__(self, reference, order_key):
+        self._reference = reference
+        self._order_key = order_key
+        self._start = None
+        self._end = None
+        self._limit_first = None
+        self._limit_last = None
+
+    def start_at(self, value):
+        self._start = value
+        return self
+
+    def end_at(self, value):
+        self._end = value
+        return self
+
+    def limit_to_first(self, limit):
+        self._limit_first = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self._limit_last = limit
+        return self
+
+    def get(self):
+        children = self._reference.get()
+        if not isinstance(children, dict):
+            return OrderedDict()
+        ordered = sorted(children.items(), key=lambda kv: _sort_key((self._order_key(kv[0], kv[1]), kv[0])))
+        selected = []
+        for key, value in ordered:
+            sort_value = self._order_key(key, value)
+            if self._start is not None and _sort_key((sort_value, '')) < _sort_key((self._start, '')):
+                continue
+            if self._end is not None and _sort_key((sort_value, '')) > _sort_key((self._end, '')):
+                continue
+            selected.append((key, value))
+        if self._limit_first is not None:
+            selected = selected[:self._limit_first]
+        if self._limit_last is not None:
+            selected = selected[-self._limit_last:] if self._limit_last else []
+        return OrderedDict(selected)
@@ -0,0 +1,295 @@
+"""Versioned chatbot model bundles with zero-downtime hot reload.
+
+A bundle is a directory holding the four serving artifacts (model, tokenizer,
+label encoder, dataset), an optional nearest-neighbour response index and a
+`manifest.json` with the sha256 of every artifact. The bundle version is a
+hash over those digests, so identical artifacts always get the same version.
+
+    bundles/
+        CURRENT                 # name of the active bundle directory
+        3f9a1c2b7d4e/
+            manifest.json
+            best_chatbot_model.keras
+            tokenizer.pkl
+            label_encoder.pkl
+            dataset_chatbot_updated.csv
+            response_index/     # optional
+
+Publish the artifacts in the working directory as a new active bundle with:
+
+    python model_bundle.py publish
+
+The serving process loads and warms up a new bundle in the background and then
+swaps a single reference, so requests that already picked up the old bundle
+finish on it while new requests use the new one.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from response_index import INDEX_DIR, ResponseIndex, build_query_encoder, file_sha256
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_ROOT = 'bundles'
+CURRENT_POINTER = 'CURRENT'
+MANIFEST_NAME = 'manifest.json'
+MAX_SEQ_LENGTH = 50
+
+MODEL_FILE = 'best_chatbot_model.keras'
+TOKENIZER_FILE = 'tokenizer.pkl'
+LABEL_ENCODER_FILE = 'label_encoder.pkl'
+DATASET_FILE = 'dataset_chatbot_updated.csv'
+ARTIFACTS = (MODEL_FILE, TOKENIZER_FILE, LABEL_ENCODER_FILE, DATASET_FILE)
+
+
+class BundleError(Exception):
+    """Raised when a bundle is missing artifacts or fails verification."""
+
+
+def build_manifest(source_dir):
+    files = {}
+    for name in ARTIFACTS:
+        path = os.path.join(source_dir, name)
+        if not os.path.exists(path):
+            raise BundleError(f'Missing artifact {name} in {source_dir}')
+        files[name] = file_sha256(path)
+    version = hashlib.sha256(''.join(f'{name}:{files[name]};' for name in ARTIFACTS).encode()).hexdigest()[:12]
+    return {'version': version, 'files': files, 'created': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def read_current_version(bundle_root=BUNDLE_ROOT):
+    try:
+        with open(os.path.join(bundle_root, CURRENT_POINTER)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def set_current_version(version, bundle_root=BUNDLE_ROOT):
+    """Atomically point CURRENT at `version`."""
+    fd, tmp_path = tempfile.mkstemp(dir=bundle_root, prefix='.CURRENT.')
+    with os.fdopen(fd, 'w') as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(bundle_root, CURRENT_POINTER))
+
+
+def is_bundle_version(version, bundle_root=BUNDLE_ROOT):
+    """True if `version` is a plain name (no path parts) of an existing bundle directory."""
+    if not isinstance(version, str) or not version or version.startswith('.'):
+        return False
+    if os.path.basename(version) != version or os.path.sep in version or '/' in version:
+        return False
+    return os.path.isdir(os.path.join(bundle_root, version))
+
+
+def publish_bundle(source_dir='.', bundle_root=BUNDLE_ROOT, activate=True):
+    """Copy the serving artifacts from `source_dir` into a new versioned bundle."""
+    manifest = build_manifest(source_dir)
+    bundle_dir = os.path.join(bundle_root, manifest['version'])
+    if not os.path.exists(bundle_dir):
+        os.makedirs(bundle_root, exist_ok=True)
+        staging_dir = tempfile.mkdtemp(dir=bundle_root, prefix='.staging-')
+        for name in ARTIFACTS:
+            shutil.copy2(os.path.join(source_dir, name), os.path.join(staging_dir, name))
+        index_dir = os.path.join(source_dir, INDEX_DIR)
+        if os.path.isdir(index_dir):
+            shutil.copytree(index_dir, os.path.join(staging_dir, INDEX_DIR))
+        with open(os.path.join(staging_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(staging_dir, bundle_dir)
+    if activate:
+        set_current_version(manifest['version'], bundle_root)
+    return manifest['version']
+
+
+class ModelBundle:
+    """All artifacts one chat request needs, loaded together and never mutated."""
+
+    def __init__(self, version, model, tokenizer, label_encoder, data_df, response_index=None, query_encoder=None):
+        self.version = version
+        self.model = model
+        self.tokenizer = tokenizer
+        self.label_encoder = label_encoder
+        self.data_df = data_df
+        self.response_index = response_index
+        self.query_encoder = query_encoder
+
+    @classmethod
+    def load(cls, bundle_dir, response_mode='first', verify=True):
+        import pandas as pd
+        from tensorflow.keras.models import load_model
+
+        manifest_path = os.path.join(bundle_dir, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if verify:
+                for name, digest in manifest['files'].items():
+                    if file_sha256(os.path.join(bundle_dir, name)) != digest:
+                        raise BundleError(f'Checksum mismatch for {name} in {bundle_dir}')
+        else:
+            # Unpublished artifacts (e.g. the flat chatbot_model directory)
+            manifest = build_manifest(bundle_dir)
+
+        model = load_model(os.path.join(bundle_dir, MODEL_FILE), compile=False)
+        with open(os.path.join(bundle_dir, TOKENIZER_FILE), 'rb') as f:
+            tokenizer = pickle.load(f)
+        with open(os.path.join(bundle_dir, LABEL_ENCODER_FILE), 'rb') as f:
+            label_encoder = pickle.load(f)
+        data_df = pd.read_csv(os.path.join(bundle_dir, DATASET_FILE))
+        data_df['Age'] = pd.to_numeric(data_df['Age'], errors='coerce')
+
+        response_index = query_encoder = None
+        if response_mode == 'nearest':
+            response_index = ResponseIndex.load(
+                os.path.join(bundle_dir, INDEX_DIR),
+                data_path=os.path.join(bundle_dir, DATASET_FILE),
+                model_path=os.path.join(bundle_dir, MODEL_FILE))
+            if response_index is not None:
+                query_encoder = build_query_encoder(model)
+
+        bundle = cls(manifest['version'], model, tokenizer, label_encoder, data_df, response_index, query_encoder)
+        bundle.warm_up()
+        return bundle
+
+    def warm_up(self):
+        """Run one forward pass so graph tracing happens before the bundle takes traffic."""
+        dummy = np.zeros((1, MAX_SEQ_LENGTH), dtype=np.int32)
+        encoder = self.query_encoder if self.query_encoder is not None else self.model
+        encoder.predict(dummy, verbose=0)
+
+
+class BundleManager:
+    """Holds the active bundle and swaps in new ones without blocking requests.
+
+    Request handlers read `manager.current` once and use that bundle for the
+    whole request; the swap is a single reference assignment.
+    """
+
+    def __init__(self, bundle_root=BUNDLE_ROOT, fallback_dir='.', response_mode='first'):
+        self.bundle_root = bundle_root
+        self.fallback_dir = fallback_dir
+        self.response_mode = response_mode
+        self.current = None
+        self.last_error = None
+        self.reloading = False
+        self._reload_lock = threading.Lock()
+
+    def has_version(self, version):
+        """True if `version` names an existing bundle directory directly under the bundle root."""
+        return is_bundle_version(version, self.bundle_root)
+
+    def _bundle_dir(self, version):
+        if version is None:
+            return self.fallback_dir
+        if not self.has_version(version):
+            raise BundleError(f'Unknown bundle version: {version!r}')
+        return os.path.join(self.bundle_root, version)
+
+    def load_initial(self):
+        version = read_current_version(self.bundle_root)
+        self.current = ModelBundle.load(self._bundle_dir(version), self.response_mode)
+        logger.info('[INFO] Serving chatbot model version %s', self.current.version)
+        return self.current
+
+    def reload(self, version=None):
+        """Load `version` (default: CURRENT pointer) and swap it in. Returns the active version."""
+        with self._reload_lock:
+            self.reloading = True
+            try:
+                version = version or read_current_version(self.bundle_root)
+                if self.current is not None and version == self.current.version:
+                    return self.current.version
+                start = time.perf_counter()
+                bundle = ModelBundle.load(self._bundle_dir(version), self.response_mode)
+                previous = self.current.version if self.current else None
+                self.current = bundle
+                self.last_error = None
+                logger.info('[INFO] Swapped chatbot model %s -> %s (loaded in %.1fs)', previous, bundle.version, time.perf_counter() - start)
+                return bundle.version
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f'[ERROR] Failed to reload chatbot model bundle {version}: {e}')
+                raise
+            finally:
+                self.reloading = False
+
+    def reload_in_background(self, version=None):
+        def run():
+            try:
+                self.reload(version)
+            except Exception:
+                pass  # already logged and kept in last_error; the old bundle keeps serving
+
+        thread = threading.Thread(target=run, name='bundle-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def start_watcher(self, interval):
+        """Poll the CURRENT pointer and reload when it changes.
+
+        A version that fails to load is not retried until CURRENT points
+        somewhere else (an explicit `reload()` still tries it).
+        """
+        def watch():
+            failed_version = None
+            while True:
+                time.sleep(interval)
+                version = read_current_version(self.bundle_root)
+                if version != failed_version:
+                    failed_version = None
+                if (version and version != failed_version and self.current is not None
+                        and version != self.current.version and not self.reloading):
+                    try:
+                        self.reload(version)
+                    except Exception:
+                        failed_version = version
+                        logger.warning('[WARNING] Skipping chatbot model bundle %s until CURRENT changes', version)
+
+        thread = threading.Thread(target=watch, name='bundle-watcher', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        return {
+            'version': self.current.version if self.current else None,
+            'pointer': read_current_version(self.bundle_root),
+            'reloading': self.reloading,
+            'lastError': self.last_error,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage versioned chatbot model bundles.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    publish = subparsers.add_parser('publish', help='Publish the artifacts in --source as a new bundle')
+    publish.add_argument('--source', default='.')
+    publish.add_argument('--bundle-root', default=BUNDLE_ROOT)
+    publish.add_argument('--no-activate', action='store_true', help='Create the bundle without updating CURRENT')
+    activate = subparsers.add_parser('activate', help='Point CURRENT at an existing bundle version')
+    activate.add_argument('version')
+    activate.add_argument('--bundle-root', default=BUNDLE_ROOT)
+    args = parser.parse_args()
+
+    if args.command == 'publish':
+        version = publish_bundle(args.source, args.bundle_root, activate=not args.no_activate)
+        print(f"[INFO] Published bundle {version}{'' if args.no_activate else ' (active)'}")
+    else:
+        if not is_bundle_version(args.version, args.bundle_root):
+            parser.error(f'Unknown bundle version: {args.version}')
+        set_current_version(args.version, args.bundle_root)
+        print(f'[INFO] Activated bundle {args.version}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Semantic nearest-neighbour response retrieval for the chatbot.
+
+Every dataset `Query` is embedded once with the trained intent model's
+encoder (the output of the last LSTM layer), L2-normalized and stored as a
+float32 matrix. Rows are grouped by intent, so the predicted intent selects a
+contiguous slice of the matrix, the same way an IVF index uses its coarse
+quantizer. The query is scored only against that slice, after the profile
+filters are applied.
+
+The index is built offline and memory-mapped at startup:
+
+    python response_index.py                  # writes response_index/
+    python response_index.py --index-dir /tmp/idx --data dataset_chatbot_updated.csv
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = 'response_index'
+MAX_SEQ_LENGTH = 50
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_query_encoder(model):
+    """Wrap the intent model so one forward pass yields (embedding, intent probabilities)."""
+    from tensorflow.keras.models import Model
+
+    return Model(inputs=model.inputs, outputs=[model.layers[-2].output, model.output])
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def encode_queries(encoder, tokenizer, queries, batch_size=512):
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+
+    padded = pad_sequences(tokenizer.texts_to_sequences(queries), maxlen=MAX_SEQ_LENGTH)
+    embeddings, _ = encoder.predict(padded, batch_size=batch_size, verbose=0)
+    return normalize(embeddings)
+
+
+def build_index(model_path, tokenizer_path, data_path, index_dir=INDEX_DIR):
+    """Embed every dataset query and write the intent-partitioned index to `index_dir`."""
+    import pickle
+
+    import pandas as pd
+    from tensorflow.keras.models import load_model
+
+    model = load_model(model_path, compile=False)
+    with open(tokenizer_path, 'rb') as f:
+        tokenizer = pickle.load(f)
+    data_df = pd.read_csv(data_path)
+
+    embeddings = encode_queries(build_query_encoder(model), tokenizer, data_df['Query'].astype(str).tolist())
+
+    intents = data_df['Intent'].astype(str).to_numpy()
+    order = np.argsort(intents, kind='stable')
+    sorted_intents = intents[order]
+    boundaries = np.flatnonzero(sorted_intents[1:] != sorted_intents[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(order)]))
+    partitions = {sorted_intents[start]: [int(start), int(end)] for start, end in zip(starts, ends)}
+
+    os.makedirs(index_dir, exist_ok=True)
+    np.save(os.path.join(index_dir, 'vectors.npy'), np.ascontiguousarray(embeddings[order]))
+    np.save(os.path.join(index_dir, 'row_ids.npy'), data_df.index.to_numpy(dtype=np.int64)[order])
+    manifest = {
+        'dataset_sha256': file_sha256(data_path),
+        'model_sha256': file_sha256(model_path),
+        'dim': int(embeddings.shape[1]),
+        'count': int(embeddings.shape[0]),
+        'partitions': partitions,
+    }
+    with open(os.path.join(index_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    logger.info('[INFO] Built response index with %d vectors over %d intents in %s', manifest['count'], len(partitions), index_dir)
+    return manifest
+
+
+class ResponseIndex:
+    """Memory-mapped, intent-partitioned response embedding index."""
+
+    def __init__(self, vectors, row_ids, partitions):
+        self.vectors = vectors
+        self.row_ids = row_ids
+        self.partitions = partitions
+
+    @classmethod
+    def load(cls, index_dir=INDEX_DIR, data_path=None, model_path=None):
+        """Load an index, returning None if it is missing or was built from other artifacts."""
+        manifest_path = os.path.join(index_dir, 'manifest.json')
+        if not os.path.exists(manifest_path):
+            logger.warning('[WARNING] Response index not found at %s', index_dir)
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        for key, path in (('dataset_sha256', data_path), ('model_sha256', model_path)):
+            if path and manifest.get(key) != file_sha256(path):
+                logger.warning('[WARNING] Response index in %s is stale (%s changed); rebuild it with response_index.py', index_dir, path)
+                return None
+        vectors = np.load(os.path.join(index_dir, 'vectors.npy'), mmap_mode='r')
+        row_ids = np.load(os.path.join(index_dir, 'row_ids.npy'), mmap_mode='r')
+        return cls(vectors, row_ids, manifest['partitions'])
+
+    def nearest(self, intent, query_vector, candidate_rows):
+        """Return the dataset row among `candidate_rows` whose query is closest to `query_vector`."""
+        bounds = self.partitions.get(str(intent))
+        if bounds is None:
+            return None
+        start, end = bounds
+        rows = self.row_ids[start:end]
+        mask = np.isin(rows, candidate_rows)
+        if not mask.any():
+            return None
+        scores = self.vectors[start:end][mask] @ np.asarray(query_vector, dtype=np.float32)
+        return int(rows[mask][int(np.argmax(scores))])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the chatbot nearest-neighbour response index.')
+    parser.add_argument('--model', default='best_chatbot_model.keras')
+    parser.add_argument('--tokenizer', default='tokenizer.pkl')
+    parser.add_argument('--data', default='dataset_chatbot_updated.csv')
+    parser.add_argument('--index-dir', default=INDEX_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    build_index(args.model, args.tokenizer, args.data, args.index_dir)
+
+
+if __name__ == '__main__':
+    main()
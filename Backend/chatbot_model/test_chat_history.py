@@ -0,0 +1,103 @@
+"""Tests for ChatHistory pagination against the in-memory database.
+
+Run from this directory:  python -m pytest -q test_chat_history.py
+"""
+import pytest
+
+from chat_history import ChatHistory, InvalidCursor
+from in_memory_db import InMemoryDatabase, generate_push_id
+
+USER = 'user-1'
+
+
+def seed(timestamps):
+    """Database with one chat per timestamp for USER; returns (db, ids newest first)."""
+    chats = {}
+    for i, timestamp in enumerate(timestamps):
+        chats[generate_push_id(now_ms=1_700_000_000_000 + i)] = {'query': f'q{i}', 'timestamp': timestamp}
+    db = InMemoryDatabase({'user_chats': {USER: chats}})
+    newest_first = sorted(chats, key=lambda key: (chats[key]['timestamp'], key), reverse=True)
+    return db, newest_first
+
+
+def all_pages(history, limit):
+    pages, cursor = [], None
+    while True:
+        page = history.page(USER, limit, cursor)
+        pages.append([item['id'] for item in page['items']])
+        cursor = page['nextCursor']
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 4, 10, 11])
+def test_pages_cover_every_item_with_tied_timestamps(limit):
+    db, expected = seed([1000, 1001, 1002, 1003, 1004, 1004, 1004, 1005, 1006, 1007])
+    pages = all_pages(ChatHistory(lambda: db), limit)
+    assert [key for page in pages for key in page] == expected
+    assert all(len(page) == limit for page in pages[:-1])
+    assert 0 < len(pages[-1]) <= limit
+
+
+def test_all_items_sharing_one_timestamp():
+    db, expected = seed([5000] * 7)
+    pages = all_pages(ChatHistory(lambda: db), 2)
+    assert [key for page in pages for key in page] == expected
+    assert len(pages) == 4
+
+
+def test_exact_multiple_ends_without_empty_page():
+    db, expected = seed(range(6))
+    pages = all_pages(ChatHistory(lambda: db), 3)
+    assert pages == [expected[:3], expected[3:]]
+
+
+def test_empty_history():
+    assert ChatHistory(lambda: InMemoryDatabase()).page(USER) == {'items': [], 'nextCursor': None}
+
+
+def test_invalid_cursor():
+    db, _ = seed(range(3))
+    with pytest.raises(InvalidCursor):
+        ChatHistory(lambda: db).page(USER, 2, 'not-a-cursor')
+
+
+def test_first_page_cached_until_save():
+    db, _ = seed(range(3))
+    hits = []
+    history = ChatHistory(lambda: db, on_cache_hit=lambda: hits.append(1))
+    first = history.page(USER, 2)
+    assert history.page(USER, 2) is first
+    assert len(hits) == 1
+
+    push_id = history.save(USER, 'new', 'reply', 'en-US')
+    assert history.page(USER, 2)['items'][0]['id'] == push_id
+    assert len(hits) == 1
+    assert db.reference('chats').child(push_id).get()['query'] == 'new'
+
+
+def test_save_uses_server_timestamp_without_fallback():
+    db = InMemoryDatabase()
+    fallbacks = []
+    history = ChatHistory(lambda: db, on_timestamp_fallback=lambda: fallbacks.append(1))
+    push_id = history.save(USER, 'q', 'r', 'en-US')
+    timestamp = db.reference('user_chats').child(USER).child(push_id).get()['timestamp']
+    assert isinstance(timestamp, int) and timestamp > 1_700_000_000_000
+    assert fallbacks == []
+
+
+def test_failed_write_retries_with_client_timestamp():
+    db = InMemoryDatabase()
+    fallbacks = []
+    failures = iter([True])
+
+    class FlakyDatabase:
+        def reference(self, path='/'):
+            if next(failures, False):
+                raise ConnectionError('write failed')
+            return db.reference(path)
+
+    history = ChatHistory(FlakyDatabase, on_timestamp_fallback=lambda: fallbacks.append(1))
+    push_id = history.save(USER, 'q', 'r', 'en-US')
+    assert isinstance(db.reference('chats').child(push_id).get()['timestamp'], int)
+    assert fallbacks == [1]
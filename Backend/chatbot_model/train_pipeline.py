@@ -0,0 +1,347 @@
+"""Incremental training pipeline for the chatbot intent model.
+
+Produces the same artifacts as component_04_chatbot.py (label_encoder.pkl,
+tokenizer.pkl, cleaned_dataset.csv, best_chatbot_model.keras) but:
+
+- caches the cleaned/tokenized/padded arrays keyed by the dataset hash, so an
+  unchanged dataset skips preprocessing entirely;
+- warm-starts from the currently published model when the updated dataset is
+  compatible with it (no new intents, few out-of-vocabulary words), so a
+  dataset update fine-tunes for a few epochs instead of training from scratch;
+- streams batches through a shuffled, prefetched tf.data pipeline;
+- stops early on a validation split carved out of the training data and keeps
+  the best checkpoint, leaving the test split untouched for evaluation;
+- backs up training state every epoch so an interrupted run resumes where it
+  stopped instead of starting from scratch;
+- keeps the best val_loss and patience counter across a resume, so a worse
+  first epoch after an interruption cannot replace the best checkpoint;
+- publishes the model, tokenizer, label encoder and cleaned dataset together,
+  only after training succeeds, so they always match each other, then
+  publishes and activates them as a versioned bundle (model_bundle.py) so a
+  running chatbot with CHATBOT_BUNDLE_WATCH_INTERVAL set picks them up;
+- evaluates the test split and the sample queries in single batched passes.
+
+Usage:
+    python train_pipeline.py
+    python train_pipeline.py --data dataset_chatbot_updated.csv --epochs 30 --patience 3
+    python train_pipeline.py --cold     # train from scratch even if a warm start is possible
+    python train_pipeline.py --fresh    # ignore cached arrays and backups
+    python train_pipeline.py --no-bundle    # only update the flat files in this directory
+
+When serving with CHATBOT_RESPONSE_MODE=nearest, rebuild the response index
+(python response_index.py) and run `python model_bundle.py publish` again
+after training; a stale index is ignored when the bundle loads.
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+
+MAX_NUM_WORDS = 5000
+MAX_SEQ_LENGTH = 50
+# Bump when the preprocessing below changes so stale caches are not reused
+PREPROCESS_VERSION = 2
+VALIDATION_SPLIT = 0.1
+# Warm starts are refused when more than this share of query words is unknown to the published tokenizer
+MAX_WARM_START_OOV = 0.05
+
+CACHE_ROOT = '.train_cache'
+CHECKPOINT_FILE = 'best_model.keras'
+TRAINING_STATE_FILE = 'training_state.json'
+TOKENIZER_FILE = 'tokenizer.pkl'
+LABEL_ENCODER_FILE = 'label_encoder.pkl'
+CLEANED_DATA_FILE = 'cleaned_dataset.csv'
+
+TEST_QUERIES = [
+    "How can I control my blood sugar naturally?",
+    "මට අධි රුධිර පීඩනය පාලනය කරන්න උපදෙස් දෙන්න."
+]
+
+
+def dataset_hash(data_path, base_paths=()):
+    """Hash of the dataset, the preprocessing parameters and any warm-start base artifacts."""
+    digest = hashlib.sha256()
+    digest.update(f'v{PREPROCESS_VERSION}:{MAX_NUM_WORDS}:{MAX_SEQ_LENGTH}:{VALIDATION_SPLIT}:'.encode())
+    for path in (data_path,) + tuple(base_paths):
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def clean(data):
+    data = data.drop_duplicates()
+    data = data.replace('None', 'Healthy')
+    return data.fillna('Unknown')
+
+
+def warm_start_base(data_path, model_path, max_oov=MAX_WARM_START_OOV):
+    """Return (tokenizer, label_encoder) of the published model if the dataset can reuse them, else None.
+
+    A warm start keeps the published vocabulary and intent indices, so it is
+    only possible when every intent in the dataset is already known and the
+    share of query words outside the published vocabulary is at most `max_oov`.
+    """
+    if not all(os.path.exists(path) for path in (model_path, TOKENIZER_FILE, LABEL_ENCODER_FILE)):
+        print("[INFO] No published model to warm-start from; training from scratch")
+        return None
+    with open(TOKENIZER_FILE, 'rb') as f:
+        tokenizer = pickle.load(f)
+    with open(LABEL_ENCODER_FILE, 'rb') as f:
+        label_encoder = pickle.load(f)
+
+    data = clean(pd.read_csv(data_path))
+    new_intents = set(data['Intent']) - set(label_encoder.classes_)
+    if new_intents:
+        print(f"[INFO] Dataset adds {len(new_intents)} new intent(s); training from scratch")
+        return None
+
+    sequences = tokenizer.texts_to_sequences(data['Query'])
+    oov_index = tokenizer.word_index.get(tokenizer.oov_token)
+    total = sum(len(seq) for seq in sequences)
+    unknown = sum(token == oov_index for seq in sequences for token in seq)
+    oov_rate = unknown / total if total else 0.0
+    if oov_rate > max_oov:
+        print(f"[INFO] {oov_rate:.1%} of query words are outside the published vocabulary; training from scratch")
+        return None
+    print(f"[INFO] Warm-starting from {model_path} ({oov_rate:.1%} out-of-vocabulary words)")
+    return tokenizer, label_encoder
+
+
+def preprocess(data_path, cache_dir, base=None):
+    """Clean, encode, tokenize and split the dataset, writing everything to `cache_dir`.
+
+    With `base` = (tokenizer, label_encoder) the published vocabulary and
+    intent indices are reused instead of being refitted.
+    """
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import LabelEncoder
+    from tensorflow.keras.preprocessing.text import Tokenizer
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+
+    data = clean(pd.read_csv(data_path))
+
+    if base is not None:
+        tokenizer, encoder = base
+        data['Intent'] = encoder.transform(data['Intent'])
+    else:
+        encoder = LabelEncoder()
+        data['Intent'] = encoder.fit_transform(data['Intent'])
+        tokenizer = Tokenizer(num_words=MAX_NUM_WORDS, oov_token="<OOV>")
+        tokenizer.fit_on_texts(data['Query'])
+
+    X = pad_sequences(tokenizer.texts_to_sequences(data['Query']), maxlen=MAX_SEQ_LENGTH)
+    y = np.array(data['Intent'], dtype=int)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_val, y_train, y_val = train_test_split(X_train, y_train, test_size=VALIDATION_SPLIT, random_state=42)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez(os.path.join(cache_dir, 'arrays.npz'), X_train=X_train, X_val=X_val, X_test=X_test,
+             y_train=y_train, y_val=y_val, y_test=y_test)
+    with open(os.path.join(cache_dir, LABEL_ENCODER_FILE), 'wb') as f:
+        pickle.dump(encoder, f)
+    with open(os.path.join(cache_dir, TOKENIZER_FILE), 'wb') as f:
+        pickle.dump(tokenizer, f)
+    data.to_csv(os.path.join(cache_dir, CLEANED_DATA_FILE), index=False)
+
+
+def load_or_preprocess(data_path, base=None, fresh=False):
+    """Return (cache_dir, arrays, tokenizer, label_encoder), preprocessing only on a cache miss."""
+    base_paths = (TOKENIZER_FILE, LABEL_ENCODER_FILE) if base is not None else ()
+    cache_dir = os.path.join(CACHE_ROOT, dataset_hash(data_path, base_paths))
+    arrays_path = os.path.join(cache_dir, 'arrays.npz')
+    if fresh and os.path.exists(cache_dir):
+        shutil.rmtree(cache_dir)
+    if os.path.exists(arrays_path):
+        print(f"[INFO] Using cached preprocessing from {cache_dir}")
+    else:
+        print(f"[INFO] Preprocessing {data_path} into {cache_dir}")
+        preprocess(data_path, cache_dir, base)
+
+    with np.load(arrays_path) as npz:
+        arrays = {key: npz[key] for key in npz.files}
+    with open(os.path.join(cache_dir, TOKENIZER_FILE), 'rb') as f:
+        tokenizer = pickle.load(f)
+    with open(os.path.join(cache_dir, LABEL_ENCODER_FILE), 'rb') as f:
+        label_encoder = pickle.load(f)
+    return cache_dir, arrays, tokenizer, label_encoder
+
+
+def make_dataset(X, y, batch_size, shuffle, seed=42):
+    import tensorflow as tf
+
+    ds = tf.data.Dataset.from_tensor_slices((X, y))
+    if shuffle:
+        ds = ds.shuffle(len(X), seed=seed, reshuffle_each_iteration=True)
+    else:
+        ds = ds.cache()
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def create_model(num_classes):
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Dense, LSTM, Embedding
+
+    model = Sequential([
+        Embedding(MAX_NUM_WORDS, 128, input_length=MAX_SEQ_LENGTH),
+        LSTM(64, return_sequences=True),
+        LSTM(32),
+        Dense(num_classes, activation='softmax')
+    ])
+    model.compile(loss='sparse_categorical_crossentropy', optimizer='adam', metrics=['accuracy'])
+    return model
+
+
+def load_base_model(model_path):
+    from tensorflow.keras.models import load_model
+
+    model = load_model(model_path, compile=False)
+    model.compile(loss='sparse_categorical_crossentropy', optimizer='adam', metrics=['accuracy'])
+    return model
+
+
+def resumable_early_stopping(state_path, resume, **kwargs):
+    """EarlyStopping whose best value and patience counter are saved every epoch and restored on resume.
+
+    BackupAndRestore restores weights, optimizer and epoch but not callback
+    state, so without this a resumed run starts again from best = inf.
+    """
+    from tensorflow.keras.callbacks import EarlyStopping
+
+    class ResumableEarlyStopping(EarlyStopping):
+        def on_train_begin(self, logs=None):
+            super().on_train_begin(logs)
+            state = load_training_state(state_path) if resume else None
+            if state is not None:
+                self.best, self.wait = state['best'], state['wait']
+                print(f"[INFO] Resuming with best val_loss {self.best:.4f} after {self.wait} epoch(s) without improvement")
+
+        def on_epoch_end(self, epoch, logs=None):
+            super().on_epoch_end(epoch, logs)
+            with open(state_path + '.tmp', 'w') as f:
+                json.dump({'best': float(self.best), 'wait': int(self.wait)}, f)
+            os.replace(state_path + '.tmp', state_path)
+
+    return ResumableEarlyStopping(**kwargs)
+
+
+def load_training_state(state_path):
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path) as f:
+        return json.load(f)
+
+
+def train(arrays, num_classes, cache_dir, epochs, batch_size, patience, base_model_path=None):
+    """Fit on the training split, early-stopping on the validation split; returns the best checkpoint."""
+    from tensorflow.keras.callbacks import BackupAndRestore, ModelCheckpoint
+    from tensorflow.keras.models import load_model
+
+    train_ds = make_dataset(arrays['X_train'], arrays['y_train'], batch_size, shuffle=True)
+    val_ds = make_dataset(arrays['X_val'], arrays['y_val'], batch_size, shuffle=False)
+    checkpoint_path = os.path.join(cache_dir, CHECKPOINT_FILE)
+    backup_dir = os.path.join(cache_dir, 'backup')
+    state_path = os.path.join(cache_dir, TRAINING_STATE_FILE)
+
+    # A backup only exists if the previous run was interrupted; otherwise start clean
+    resume = os.path.isdir(backup_dir) and os.path.exists(checkpoint_path)
+    state = load_training_state(state_path) if resume else None
+    callbacks = [
+        # Restores model, optimizer and epoch after an interruption; removed once fit() completes
+        BackupAndRestore(backup_dir=backup_dir),
+        resumable_early_stopping(state_path, resume, monitor='val_loss', patience=patience),
+        ModelCheckpoint(checkpoint_path, monitor='val_loss', save_best_only=True,
+                        initial_value_threshold=state['best'] if state else None),
+    ]
+    model = load_base_model(base_model_path) if base_model_path else create_model(num_classes)
+    model.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=callbacks, verbose=1)
+    # The checkpoint holds the best epoch whether or not early stopping fired
+    return load_model(checkpoint_path), checkpoint_path
+
+
+def publish(cache_dir, checkpoint_path, model_path):
+    """Copy the model and its matching preprocessing artifacts into the serving directory.
+
+    Everything is staged next to its destination first and only then renamed
+    into place, so a failure part-way leaves the previous set untouched.
+    """
+    artifacts = [
+        (checkpoint_path, model_path),
+        (os.path.join(cache_dir, TOKENIZER_FILE), TOKENIZER_FILE),
+        (os.path.join(cache_dir, LABEL_ENCODER_FILE), LABEL_ENCODER_FILE),
+        (os.path.join(cache_dir, CLEANED_DATA_FILE), CLEANED_DATA_FILE),
+    ]
+    for source, destination in artifacts:
+        shutil.copyfile(source, destination + '.tmp')
+    for _, destination in artifacts:
+        os.replace(destination + '.tmp', destination)
+    print(f"[INFO] Published {', '.join(destination for _, destination in artifacts)}")
+
+
+def publish_serving_bundle(data_path):
+    """Publish the flat artifacts as a new active bundle; the server ignores them once bundles/CURRENT exists."""
+    from model_bundle import DATASET_FILE, publish_bundle
+
+    if os.path.abspath(data_path) != os.path.abspath(DATASET_FILE):
+        print(f"[WARN] Bundles serve {DATASET_FILE}, not {data_path}; skipping bundle publish")
+        return None
+    version = publish_bundle('.')
+    print(f"[INFO] Published and activated chatbot model bundle {version}")
+    return version
+
+
+def evaluate(model, arrays, tokenizer, label_encoder, data_path, batch_size):
+    """Score the held-out test split and the sample queries, each in one batched predict call."""
+    from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+
+    y_test = arrays['y_test']
+    test_ds = make_dataset(arrays['X_test'], y_test, batch_size, shuffle=False)
+    y_pred = np.argmax(model.predict(test_ds, verbose=0), axis=1)
+    print('Model Accuracy:', accuracy_score(y_test, y_pred))
+    print('Confusion Matrix:\n', confusion_matrix(y_test, y_pred))
+    print('Classification Report:\n', classification_report(y_test, y_pred, zero_division=0))
+
+    data = pd.read_csv(data_path)
+    first_response = data.drop_duplicates('Intent').set_index('Intent')['Response']
+    padded = pad_sequences(tokenizer.texts_to_sequences(TEST_QUERIES), maxlen=MAX_SEQ_LENGTH)
+    intents = label_encoder.inverse_transform(np.argmax(model.predict(padded, batch_size=batch_size, verbose=0), axis=1))
+    fallback = "Sorry, I don't understand your question."
+    for query, intent in zip(TEST_QUERIES, intents):
+        print(f"\nQuery: {query}")
+        print(f"Response: {first_response.get(intent, fallback)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the chatbot intent model with cached preprocessing.')
+    parser.add_argument('--data', default='dataset_chatbot_updated.csv')
+    parser.add_argument('--model-path', default='best_chatbot_model.keras')
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--patience', type=int, default=3)
+    parser.add_argument('--max-oov', type=float, default=MAX_WARM_START_OOV,
+                        help='Largest share of unknown query words that still allows a warm start')
+    parser.add_argument('--cold', action='store_true', help='Train from scratch instead of warm-starting')
+    parser.add_argument('--fresh', action='store_true', help='Discard cached arrays and training backups')
+    parser.add_argument('--no-bundle', action='store_true',
+                        help='Only update the flat artifacts; do not publish a versioned bundle')
+    args = parser.parse_args()
+
+    base = None if args.cold else warm_start_base(args.data, args.model_path, args.max_oov)
+    cache_dir, arrays, tokenizer, label_encoder = load_or_preprocess(args.data, base, fresh=args.fresh)
+    num_classes = len(label_encoder.classes_)
+    model, checkpoint_path = train(arrays, num_classes, cache_dir, args.epochs, args.batch_size, args.patience,
+                                   base_model_path=args.model_path if base is not None else None)
+    publish(cache_dir, checkpoint_path, args.model_path)
+    if not args.no_bundle:
+        publish_serving_bundle(args.data)
+    evaluate(model, arrays, tokenizer, label_encoder, args.data, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
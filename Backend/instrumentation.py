@@ -0,0 +1,309 @@
+"""Shared hot-path instrumentation for the CeylonCare Python services.
+
+Provides per-stage timers, counters and a Prometheus-style text exposition
+that each Flask service mounts on `/metrics`, plus a `/log_level` endpoint to
+switch log verbosity at runtime without a restart.
+
+The startup profiler records wall time and RSS growth for each import and
+init phase (`startup_phase`) and is reported on `/startup` and `/metrics`;
+`/ready` returns 503 until the service calls `mark_ready()`. Time to ready is
+measured from process start (read from /proc on Linux). Flask is only
+imported by `register_metrics_endpoint`, so importing this module first does
+not hide Flask's import cost from the service's own phases.
+
+Usage from a service script:
+
+    from instrumentation import configure_logging, stage_timer, register_metrics_endpoint
+
+    logger = configure_logging(__name__)
+    register_metrics_endpoint(app, service='chatbot')
+
+    with stage_timer('inference'):
+        model.predict(...)
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Latency buckets in seconds, from sub-millisecond tokenization up to slow Speech calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by a label tuple."""
+
+    def __init__(self, name, help_text, label_names, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            bucket_counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    bucket_counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        for label_values, (bucket_counts, total, count) in sorted(snapshot.items()):
+            labels = _format_labels(self.label_names, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names + ("le",), label_values + (repr(bound),))} {cumulative}')
+            lines.append(f'{self.name}_bucket{_format_labels(self.label_names + ("le",), label_values + ("+Inf",))} {count}')
+            lines.append(f'{self.name}_sum{labels} {total:.6f}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by a label tuple."""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            snapshot = dict(self._values)
+        for label_values, value in sorted(snapshot.items()):
+            lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {value}')
+        return lines
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"')) for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+STAGE_DURATION = Histogram('ceyloncare_stage_duration_seconds', 'Time spent per hot-path stage.', ('service', 'stage'))
+STAGE_ERRORS = Counter('ceyloncare_stage_errors_total', 'Hot-path stages that raised an exception.', ('service', 'stage'))
+EVENTS = Counter('ceyloncare_events_total', 'Named service events (requests, fallbacks, cache hits).', ('service', 'event'))
+REQUEST_DURATION = Histogram('ceyloncare_request_duration_seconds', 'End-to-end request latency per endpoint.', ('service', 'endpoint', 'status'))
+
+_registry = [STAGE_DURATION, STAGE_ERRORS, EVENTS, REQUEST_DURATION]
+_service_name = os.environ.get('CEYLONCARE_SERVICE', 'unknown')
+
+
+_startup_phases = []
+_startup_lock = threading.Lock()
+_ready_after = None
+
+
+def _seconds_since_process_start():
+    """Age of this process from /proc (Linux), or None where it is unavailable."""
+    try:
+        with open('/proc/self/stat') as f:
+            # The command name may contain spaces; fields after it start at field 3 (state)
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+# Readiness is measured from process start (interpreter start-up and every import
+# before this module included) where /proc allows, else from this module's import
+_process_start_offset = _seconds_since_process_start()
+_process_start = time.perf_counter() - (_process_start_offset or 0.0)
+
+
+def current_rss_bytes():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@contextmanager
+def startup_phase(name):
+    """Record wall time and RSS growth of an import or init phase."""
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        phase = {
+            'phase': name,
+            'seconds': round(time.perf_counter() - start, 4),
+            'rss_delta_bytes': current_rss_bytes() - rss_before,
+            'after_ready': _ready_after is not None,
+        }
+        with _startup_lock:
+            _startup_phases.append(phase)
+
+
+def mark_ready(logger=None):
+    """Mark the service ready and log the startup profile."""
+    global _ready_after
+    _ready_after = time.perf_counter() - _process_start
+    if logger is not None:
+        logger.info('[INFO] Service ready after %.2fs, RSS %.1f MB', _ready_after, current_rss_bytes() / 1048576)
+        for phase in startup_report()['phases']:
+            logger.info('[INFO] Startup phase %-28s %8.3fs %+9.1f MB', phase['phase'], phase['seconds'], phase['rss_delta_bytes'] / 1048576)
+
+
+def startup_report():
+    with _startup_lock:
+        phases = list(_startup_phases)
+    return {
+        'ready': _ready_after is not None,
+        'ready_after_seconds': round(_ready_after, 4) if _ready_after is not None else None,
+        'ready_measured_from': 'process_start' if _process_start_offset is not None else 'instrumentation_import',
+        'instrumentation_import_after_seconds': round(_process_start_offset, 4) if _process_start_offset is not None else None,
+        'rss_bytes': current_rss_bytes(),
+        'phases': phases,
+    }
+
+
+def _render_startup():
+    report = startup_report()
+    lines = [
+        '# HELP ceyloncare_startup_phase_seconds Wall time of each startup import/init phase.',
+        '# TYPE ceyloncare_startup_phase_seconds gauge',
+    ]
+    for phase in report['phases']:
+        lines.append(f"ceyloncare_startup_phase_seconds{_format_labels(('service', 'phase'), (_service_name, phase['phase']))} {phase['seconds']}")
+    lines += [
+        '# HELP ceyloncare_startup_phase_rss_delta_bytes RSS growth of each startup import/init phase.',
+        '# TYPE ceyloncare_startup_phase_rss_delta_bytes gauge',
+    ]
+    for phase in report['phases']:
+        lines.append(f"ceyloncare_startup_phase_rss_delta_bytes{_format_labels(('service', 'phase'), (_service_name, phase['phase']))} {phase['rss_delta_bytes']}")
+    if report['ready_after_seconds'] is not None:
+        lines += [
+            '# HELP ceyloncare_ready_seconds Seconds from process start until the service was ready.',
+            '# TYPE ceyloncare_ready_seconds gauge',
+            f"ceyloncare_ready_seconds{_format_labels(('service',), (_service_name,))} {report['ready_after_seconds']}",
+        ]
+    return lines
+
+
+def set_service_name(name):
+    global _service_name
+    _service_name = name
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time a hot-path stage and record it in the stage histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(_service_name, stage)
+        raise
+    finally:
+        STAGE_DURATION.observe(time.perf_counter() - start, _service_name, stage)
+
+
+def count_event(event, amount=1):
+    EVENTS.inc(_service_name, event, amount=amount)
+
+
+def render_metrics():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    lines.extend(_render_startup())
+    return '\n'.join(lines) + '\n'
+
+
+def configure_logging(name, default_level='INFO'):
+    """Configure root logging from LOG_LEVEL (default INFO) and return a named logger."""
+    level = os.environ.get('LOG_LEVEL', default_level).upper()
+    logging.basicConfig(level=getattr(logging, level, logging.INFO), format=LOG_FORMAT)
+    return logging.getLogger(name)
+
+
+def register_metrics_endpoint(app, service, admin_token=None):
+    """Mount `/metrics`, `/log_level`, `/startup` and `/ready` on a Flask app and time every request.
+
+    `/ready` returns 503 until the service calls `mark_ready()` at the end of its module setup.
+    Changing the level with POST `/log_level` needs an `X-Admin-Token` header matching
+    `admin_token` (default: the ADMIN_TOKEN env var); without a configured token it is read-only.
+    """
+    # Imported here so Flask's import cost lands in the service's own startup phase
+    from flask import jsonify, request, Response
+
+    admin_token = admin_token or os.environ.get('ADMIN_TOKEN')
+    set_service_name(service)
+
+    @app.before_request
+    def _start_request_timer():
+        request.environ['ceyloncare.start'] = time.perf_counter()
+
+    @app.after_request
+    def _record_request_duration(response):
+        start = request.environ.get('ceyloncare.start')
+        if start is not None and request.endpoint not in ('metrics', 'log_level', 'startup', 'ready'):
+            REQUEST_DURATION.observe(time.perf_counter() - start, _service_name, request.endpoint or 'unknown', str(response.status_code))
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    @app.route('/log_level', methods=['GET', 'POST'])
+    def log_level():
+        root = logging.getLogger()
+        if request.method == 'POST':
+            if not admin_token or request.headers.get('X-Admin-Token') != admin_token:
+                return jsonify({'error': 'Forbidden'}), 403
+            data = request.get_json(silent=True) or {}
+            level_name = str(data.get('level', '')).upper()
+            level = logging.getLevelName(level_name)
+            if not isinstance(level, int):
+                return jsonify({'error': f'Unknown log level: {level_name}'}), 400
+            root.setLevel(level)
+        return jsonify({'level': logging.getLevelName(root.level)})
+
+    @app.route('/startup', methods=['GET'])
+    def startup():
+        return jsonify(startup_report())
+
+    @app.route('/ready', methods=['GET'])
+    def ready():
+        report = startup_report()
+        return jsonify({'ready': report['ready']}), 200 if report['ready'] else 503